@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+    __init__.py
+    ~~~~~~~~
+    基准测试: 进程内模拟 ES, 离线对比新建/删除索引和 reindex 流程的性能
+
+    :author: Fufu, 2026/10/18
+"""
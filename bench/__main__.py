@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+    __main__.py
+    ~~~~~~~~
+    基准测试入口, 在项目根目录运行:
+
+        python -m bench
+        python -m bench -s main --families 2000 --latency 0.01 --fail-rate 0.01 --save bench_output.json
+        python -m bench --compare bench_output.json
+
+    :author: Fufu, 2026/10/18
+"""
+import argparse
+import json
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from .scenarios import DEFAULT_OPTIONS, SCENARIOS, run_scenario
+
+# 对比时展示的指标
+METRICS = ('wall_seconds', 'api_calls', 'max_rss_mb', 'peak_mb')
+
+
+def run(name, options, repeat):
+    """每次运行使用新的子进程, 汇总取耗时中位数"""
+    runs = []
+    for _ in range(repeat):
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+            runs.append(executor.submit(run_scenario, name, options).result())
+
+    res = dict(runs[-1])
+    res['wall_seconds'] = round(statistics.median(r['wall_seconds'] for r in runs), 3)
+    res['runs'] = [r['wall_seconds'] for r in runs]
+    return res
+
+
+def show(results, baseline=None):
+    print('{:<12} {:>10} {:>10} {:>9} {:>10} {:>9}  {}'.format(
+        'SCENARIO', 'WALL(s)', 'API-CALLS', 'FAILURES', 'RSS(MB)', 'HEAP(MB)', 'CHECKS'))
+    for name, res in results.items():
+        print('{:<12} {:>10} {:>10} {:>9} {:>10} {:>9}  {}'.format(
+            name, res['wall_seconds'], res['api_calls'], res['failures'], str(res.get('max_rss_mb')),
+            str(res.get('peak_mb', '-')), res['checks']))
+        old = (baseline or {}).get(name)
+        if not old:
+            continue
+        changes = []
+        for metric in METRICS:
+            if res.get(metric) is None or not old.get(metric):
+                continue
+            changes.append('{}: {} -> {} ({:+.1f}%)'.format(
+                metric, old[metric], res[metric], (res[metric] - old[metric]) * 100 / old[metric]))
+        print('{:<12} {}'.format('', ', '.join(changes)))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m bench', description='模拟 ES 的离线基准测试')
+    parser.add_argument('-s', '--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='要运行的场景, 可多次指定, 默认全部')
+    parser.add_argument('-r', '--repeat', type=int, default=1, help='每个场景运行次数, 耗时取中位数')
+    parser.add_argument('--save', help='结果保存为 JSON 文件')
+    parser.add_argument('--compare', help='与之前保存的结果对比')
+    parser.add_argument('--calls', action='store_true', help='显示每个接口的调用次数')
+    for key, value in DEFAULT_OPTIONS.items():
+        flag = '--' + key.replace('_', '-')
+        if isinstance(value, bool):
+            parser.add_argument(flag, dest=key, action='store_true', help='默认: {}'.format(value))
+        else:
+            parser.add_argument(flag, dest=key, type=type(value), default=value, help='默认: {}'.format(value))
+    args = parser.parse_args()
+
+    options = {key: getattr(args, key) for key in DEFAULT_OPTIONS}
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    for name in args.scenario or list(SCENARIOS):
+        results[name] = run(name, options, max(1, args.repeat))
+        if args.calls:
+            for api, n in results[name]['calls'].items():
+                print('{:<12} {:>8}  {}'.format(name, n, api))
+
+    show(results, baseline)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'options': options, 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+    fake_es.py
+    ~~~~~~~~
+    进程内模拟 ES 的 HTTP 服务, 仅实现维护脚本和 reindex 用到的接口, 可设置延迟和失败率
+
+    - 索引: 新建/查询/删除, _cat/indices, _cluster/health, _index_template
+    - reindex: _reindex(远程源集群), _tasks, _rethrottle
+    - 流式迁移: 分片 scroll 查询, _bulk, 以及 min/max/terms 聚合
+
+    :author: Fufu, 2026/10/18
+"""
+import fnmatch
+import gzip
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from esm.stats import api_name
+
+# 模拟的 ES 版本
+VERSION = '7.13.4'
+# 每个模拟文档的存储大小(字节)
+DOC_SIZE = 100
+# scroll 默认每页文档数
+SCROLL_SIZE = 1000
+
+
+class FakeCluster:
+    """模拟集群的状态
+
+    :param latency: 每个请求的延迟(秒)
+    :param fail_rate: 写请求(新建/删除索引, _reindex)返回 429/503 的概率
+    :param reindex_rate: reindex 任务每秒迁移的文档数
+    :param source: 远程 reindex 的源集群
+    """
+
+    def __init__(self, latency=0.0, fail_rate=0.0, reindex_rate=100000, source=None, seed=None):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.reindex_rate = reindex_rate
+        self.source = source
+        self.random = random.Random(seed)
+        self.lock = threading.RLock()
+        # {索引: {'creation_date': 毫秒, 'docs': 文档数, 'body': 配置}}
+        self.indices = {}
+        # {索引: 已写入的文档 _id}, 只记录 _bulk 写入的文档
+        self.docs = {}
+        self.templates = {}
+        self.tasks = {}
+        self.scrolls = {}
+        # {接口: 调用次数}
+        self.calls = {}
+        self.failures = 0
+        self._seq = 0
+
+    def add_index(self, name, docs=0, body=None, creation_date=None):
+        with self.lock:
+            self.indices[name] = {
+                'creation_date': creation_date or int(time.time() * 1000),
+                'docs': docs,
+                'body': body or {},
+            }
+
+    def match(self, expr):
+        """按逗号分隔的索引名/通配符匹配已有索引"""
+        with self.lock:
+            names = list(self.indices)
+            res = []
+            for part in expr.split(','):
+                if '*' in part:
+                    res.extend(n for n in names if fnmatch.fnmatchcase(n, part) and n not in res)
+                elif part in self.indices and part not in res:
+                    res.append(part)
+            return res
+
+    def next_id(self, prefix):
+        with self.lock:
+            self._seq += 1
+            return '{}{}'.format(prefix, self._seq)
+
+    @property
+    def api_calls(self):
+        return sum(self.calls.values())
+
+    def task_status(self, task_id):
+        """reindex 任务进度, 任务完成时目标索引文档数改为源索引文档数"""
+        with self.lock:
+            task = self.tasks[task_id]
+            elapsed = time.monotonic() - task['start']
+            done = elapsed >= task['seconds']
+            if done and not task['done']:
+                task['done'] = True
+                dest = self.indices.setdefault(task['dest'], {'creation_date': int(time.time() * 1000), 'docs': 0,
+                                                              'body': {}})
+                dest['docs'] = max(dest['docs'], task['total'])
+            created = task['total'] if done else int(task['total'] * elapsed / task['seconds'])
+            status = {'total': task['total'], 'created': created, 'updated': 0, 'deleted': 0, 'batches': 1,
+                      'version_conflicts': 0, 'noops': 0, 'throttled_millis': 0,
+                      'requests_per_second': task['rps']}
+            return done, {'status': status, 'running_time_in_nanos': int(elapsed * 1e9),
+                          'action': 'indices:data/write/reindex'}
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    cluster = None
+
+    def log_message(self, *args):
+        pass
+
+    def handle_request(self):
+        cluster = self.cluster
+        url = urlparse(self.path)
+        path = unquote(url.path).rstrip('/') or '/'
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        body = self._read_body()
+        with cluster.lock:
+            name = api_name(self.command, path)
+            cluster.calls[name] = cluster.calls.get(name, 0) + 1
+        if cluster.latency:
+            time.sleep(cluster.latency)
+
+        if self._is_write(path) and cluster.random.random() < cluster.fail_rate:
+            with cluster.lock:
+                cluster.failures += 1
+            status = cluster.random.choice([429, 503])
+            return self._send(status, {'error': {'type': 'injected', 'reason': 'injected failure'}, 'status': status})
+
+        for methods, pattern, handler in ROUTES:
+            m = pattern.match(path)
+            if m and self.command in methods:
+                return handler(self, params, body, *m.groups())
+
+        return self._send(400, {'error': {'type': 'unknown', 'reason': '{} {}'.format(self.command, path)},
+                                'status': 400})
+
+    do_GET = do_PUT = do_POST = do_DELETE = do_HEAD = handle_request
+
+    def _is_write(self, path):
+        if self.command == 'DELETE':
+            return not path.startswith('/_search')
+        if self.command == 'PUT':
+            return not path.startswith('/_')
+        return self.command == 'POST' and path == '/_reindex'
+
+    def _read_body(self):
+        n = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(n) if n else b''
+        if raw and self.headers.get('Content-Encoding') == 'gzip':
+            raw = gzip.decompress(raw)
+        return raw
+
+    def _send(self, status, body, content_type='application/json'):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(data)
+
+    def info(self, params, body):
+        return self._send(200, {'version': {'number': VERSION}, 'tagline': 'You Know, for Search'})
+
+    def health(self, params, body, index=None):
+        return self._send(200, {'status': 'green', 'timed_out': False, 'number_of_pending_tasks': 0,
+                                'task_max_waiting_in_queue_millis': 0})
+
+    def pending_tasks(self, params, body):
+        return self._send(200, {'tasks': []})
+
+    def cat_thread_pool(self, params, body, *args):
+        return self._send(200, [{'node_name': 'fake', 'name': 'write', 'active': '0', 'queue': '0',
+                                 'rejected': '0'}])
+
+    def cat_indices(self, params, body, expr=None):
+        rows = []
+        for name in self.cluster.match(expr or '*'):
+            index = self.cluster.indices.get(name)
+            if index is None:
+                continue
+            rows.append({'index': name, 'health': 'green', 'status': 'open',
+                         'creation.date': str(index['creation_date']), 'docs.count': str(index['docs']),
+                         'store.size': str(index['docs'] * DOC_SIZE)})
+        columns = params.get('h', 'index').split(',')
+        rows = [{c: row.get(c, '') for c in columns} for row in rows]
+        if params.get('format') == 'json':
+            return self._send(200, rows)
+        text = ''.join(' '.join(row[c] for c in columns) + '\n' for row in rows)
+        return self._send(200, text.encode(), 'text/plain')
+
+    def index_template(self, params, body, name):
+        templates = self.cluster.templates
+        if self.command == 'GET':
+            res = [{'name': k, 'index_template': v} for k, v in templates.items() if fnmatch.fnmatchcase(k, name)]
+            return self._send(200 if res else 404, {'index_templates': res})
+        if self.command == 'DELETE':
+            templates.pop(name, None)
+        else:
+            templates[name] = json.loads(body)
+        return self._send(200, {'acknowledged': True})
+
+    def create_index(self, params, body, name):
+        cluster = self.cluster
+        with cluster.lock:
+            if name in cluster.indices:
+                return self._send(400, {'error': {'type': 'resource_already_exists_exception',
+                                                  'reason': 'index [{}] already exists'.format(name)},
+                                        'status': 400})
+            cluster.add_index(name, body=json.loads(body) if body.strip() else {})
+        return self._send(200, {'acknowledged': True, 'shards_acknowledged': True, 'index': name})
+
+    def get_index(self, params, body, expr):
+        names = self.cluster.match(expr)
+        if not names and params.get('ignore_unavailable') != 'true':
+            return self._send(404, {'error': {'type': 'index_not_found_exception', 'reason': expr}, 'status': 404})
+        res = {}
+        for name in names:
+            index = self.cluster.indices.get(name)
+            if index is None:
+                continue
+            conf = dict(index['body'])
+            # 与 ES 一样返回默认设置和索引自身的 uuid/creation_date 等
+            settings = {'number_of_shards': '1', 'number_of_replicas': '1'}
+            settings.update((index['body'].get('settings') or {}).get('index') or {})
+            settings.update(creation_date=str(index['creation_date']), provided_name=name,
+                            uuid='{:022x}'.format(hash(name) & (2 ** 88 - 1)), version={'created': '7170099'})
+            conf['settings'] = {'index': settings}
+            res[name] = conf
+        return self._send(200, res)
+
+    def delete_index(self, params, body, expr):
+        names = self.cluster.match(expr)
+        with self.cluster.lock:
+            for name in names:
+                self.cluster.indices.pop(name, None)
+                self.cluster.docs.pop(name, None)
+        if not names and params.get('ignore_unavailable') != 'true':
+            return self._send(404, {'error': {'type': 'index_not_found_exception', 'reason': expr}, 'status': 404})
+        return self._send(200, {'acknowledged': True})
+
+    def reindex(self, params, body):
+        cluster = self.cluster
+        req = json.loads(body)
+        source = cluster.source or cluster
+        origin = source.indices.get(req['source']['index'], {})
+        task_id = cluster.next_id('fake:')
+        total = origin.get('docs', 0)
+        with cluster.lock:
+            cluster.tasks[task_id] = {
+                'start': time.monotonic(), 'seconds': total / cluster.reindex_rate, 'total': total,
+                'dest': req['dest']['index'], 'rps': float(req.get('requests_per_second', -1)), 'done': False,
+            }
+        return self._send(200, {'task': task_id})
+
+    def rethrottle(self, params, body, task_id):
+        with self.cluster.lock:
+            task = self.cluster.tasks.get(task_id)
+            if task:
+                task['rps'] = float(params.get('requests_per_second', -1))
+        return self._send(200, {'nodes': {}})
+
+    def list_tasks(self, params, body):
+        tasks = {}
+        for task_id in list(self.cluster.tasks):
+            done, task = self.cluster.task_status(task_id)
+            if not done:
+                tasks[task_id] = task
+        return self._send(200, {'nodes': {'fake': {'tasks': tasks}} if tasks else {}})
+
+    def get_task(self, params, body, task_id):
+        if task_id not in self.cluster.tasks:
+            return self._send(404, {'error': {'type': 'resource_not_found_exception', 'reason': task_id},
+                                    'status': 404})
+        done, task = self.cluster.task_status(task_id)
+        return self._send(200, {'completed': done, 'task': task})
+
+    def search(self, params, body, expr):
+        req = json.loads(body) if body.strip() else {}
+        names = self.cluster.match(expr)
+        if 'scroll' not in params:
+            buckets = [{'key': n, 'doc_count': self.cluster.indices[n]['docs'], 'max': {'value': None}}
+                       for n in names if n in self.cluster.indices]
+            return self._send(200, {'hits': {'total': {'value': 0, 'relation': 'eq'}, 'hits': []}, 'aggregations': {
+                'min': {'value': None}, 'max': {'value': None}, 'indexes': {'buckets': buckets}}})
+
+        sliced = req.get('slice')
+        hits = []
+        for name in names:
+            for n in range(self.cluster.indices[name]['docs']):
+                if sliced and n % sliced['max'] != sliced['id']:
+                    continue
+                hits.append({'_index': name, '_id': str(n), '_source': {'n': n, 'pad': 'x' * (DOC_SIZE // 2)}})
+        scroll_id = self.cluster.next_id('scroll')
+        with self.cluster.lock:
+            self.cluster.scrolls[scroll_id] = [hits, int(params.get('size', req.get('size', SCROLL_SIZE)))]
+        return self._scroll_page(scroll_id)
+
+    def scroll(self, params, body):
+        if self.command == 'DELETE':
+            with self.cluster.lock:
+                for scroll_id in (json.loads(body) if body.strip() else {}).get('scroll_id', []):
+                    self.cluster.scrolls.pop(scroll_id, None)
+            return self._send(200, {'succeeded': True})
+        return self._scroll_page(json.loads(body)['scroll_id'])
+
+    def _scroll_page(self, scroll_id):
+        with self.cluster.lock:
+            hits, size = self.cluster.scrolls.get(scroll_id, [[], 0])
+            page = hits[:size]
+            if scroll_id in self.cluster.scrolls:
+                self.cluster.scrolls[scroll_id][0] = hits[size:]
+        return self._send(200, {'_scroll_id': scroll_id, 'hits': {'total': {'value': len(page)}, 'hits': page},
+                                '_shards': {'total': 1, 'successful': 1, 'skipped': 0, 'failed': 0}})
+
+    def bulk(self, params, body):
+        lines = [line for line in body.split(b'\n') if line.strip()]
+        items = []
+        with self.cluster.lock:
+            i = 0
+            while i < len(lines):
+                meta = json.loads(lines[i])
+                op = next(iter(meta))
+                action = meta[op]
+                i += 1 if op == 'delete' else 2
+                ids = self.cluster.docs.setdefault(action['_index'], set())
+                index = self.cluster.indices.setdefault(action['_index'], {
+                    'creation_date': int(time.time() * 1000), 'docs': 0, 'body': {}})
+                doc_id = action.get('_id') or 'auto{}'.format(len(ids))
+                if doc_id in ids:
+                    if op == 'create':
+                        items.append({op: {'_id': doc_id, 'status': 409,
+                                           'error': {'type': 'version_conflict_engine_exception'}}})
+                    else:
+                        items.append({op: {'_id': doc_id, 'status': 200, 'result': 'updated'}})
+                    continue
+                ids.add(doc_id)
+                index['docs'] = max(index['docs'], len(ids))
+                items.append({op: {'_id': doc_id, 'status': 201, 'result': 'created'}})
+        errors = any(next(iter(item.values()))['status'] >= 300 for item in items)
+        return self._send(200, {'took': 1, 'errors': errors, 'items': items})
+
+
+ROUTES = [
+    ({'GET', 'HEAD'}, re.compile(r'^/$'), FakeHandler.info),
+    ({'GET'}, re.compile(r'^/_cluster/health(?:/([^/]+))?$'), FakeHandler.health),
+    ({'GET'}, re.compile(r'^/_cluster/pending_tasks$'), FakeHandler.pending_tasks),
+    ({'GET'}, re.compile(r'^/_cat/thread_pool(?:/([^/]+))?$'), FakeHandler.cat_thread_pool),
+    ({'GET'}, re.compile(r'^/_cat/indices(?:/([^/]+))?$'), FakeHandler.cat_indices),
+    ({'GET', 'PUT', 'POST', 'DELETE'}, re.compile(r'^/_index_template/([^/]+)$'), FakeHandler.index_template),
+    ({'POST'}, re.compile(r'^/_reindex$'), FakeHandler.reindex),
+    ({'POST'}, re.compile(r'^/_reindex/([^/]+)/_rethrottle$'), FakeHandler.rethrottle),
+    ({'GET'}, re.compile(r'^/_tasks$'), FakeHandler.list_tasks),
+    ({'GET'}, re.compile(r'^/_tasks/([^/]+)$'), FakeHandler.get_task),
+    ({'GET', 'POST', 'DELETE'}, re.compile(r'^/_search/scroll$'), FakeHandler.scroll),
+    ({'POST', 'PUT'}, re.compile(r'^/_bulk$'), FakeHandler.bulk),
+    ({'GET', 'POST'}, re.compile(r'^/([^/_][^/]*)/_search$'), FakeHandler.search),
+    ({'PUT'}, re.compile(r'^/([^/_][^/,*]*)$'), FakeHandler.create_index),
+    ({'GET', 'HEAD'}, re.compile(r'^/([^/_][^/]*)$'), FakeHandler.get_index),
+    ({'DELETE'}, re.compile(r'^/([^/_][^/]*)$'), FakeHandler.delete_index),
+]
+
+
+class FakeServer:
+    """在后台线程运行的模拟 ES 服务"""
+
+    def __init__(self, cluster=None, host='127.0.0.1', port=0):
+        self.cluster = cluster or FakeCluster()
+        handler = type('Handler', (FakeHandler,), {'cluster': self.cluster})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, name='fake-es', daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    @property
+    def hosts(self):
+        host, port = self.server.server_address[:2]
+        return [{'host': host, 'port': port}]
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+    scenarios.py
+    ~~~~~~~~
+    基准测试场景, 每个场景在独立的子进程中运行, 内存峰值和模块全局变量互不影响
+
+    - main: main.py 同步模式新建明天的索引, 删除过期索引
+    - main_async: main.py 异步模式(--async)
+    - reindex: Manager.start_reindex 从远程集群迁移所有索引
+
+    :author: Fufu, 2026/10/18
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from loguru import logger
+
+from .fake_es import FakeCluster, FakeServer
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# 默认参数, 可由命令行覆盖
+DEFAULT_OPTIONS = {
+    # main: 索引名称数, 每个名称已有的天数, 保留天数
+    'families': 300,
+    'days': 10,
+    'keep_days': 7,
+    'create_max_rate': 1000.0,
+    # reindex: 源索引数, 每个索引的文档数
+    'indices': 100,
+    'docs': 100000,
+    'concurrent_tasks': 10,
+    'check_interval': 1,
+    'reindex_rate': 200000,
+    'mode': 'remote',
+    # 模拟 ES
+    'latency': 0.002,
+    'fail_rate': 0.0,
+    'seed': 1,
+    'tracemalloc': False,
+    'verbose': False,
+}
+
+
+def run_scenario(name, options):
+    """在当前进程运行场景, 返回测量结果"""
+    options = dict(DEFAULT_OPTIONS, **options)
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+    logger.remove()
+    if options['verbose']:
+        logger.add(sys.stderr, level='WARNING')
+    else:
+        logging.disable(logging.WARNING)
+    if options['tracemalloc']:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    res = SCENARIOS[name](options)
+    res['wall_seconds'] = round(time.perf_counter() - start, 3)
+    if options['tracemalloc']:
+        res['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+        tracemalloc.stop()
+    res['max_rss_mb'] = max_rss_mb()
+    return res
+
+
+def max_rss_mb():
+    """进程的内存峰值(MB), 非 Unix 系统返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 的单位为字节, Linux 为 KB
+    return round(rss / 2 ** 20 if sys.platform == 'darwin' else rss / 2 ** 10, 1)
+
+
+def bench_main(options, use_async=False):
+    """模拟集群中每个索引名称有 days 天的索引, 新建明天的索引并删除超过 keep_days 天的索引"""
+    import main
+
+    cluster = FakeCluster(latency=options['latency'], fail_rate=options['fail_rate'], seed=options['seed'])
+    today = datetime.now()
+    families = ['bench_{:05d}'.format(i) for i in range(options['families'])]
+    body = {'mappings': {'properties': {'message': {'type': 'text'}, 'ts': {'type': 'date'}}}}
+    for family in families:
+        for day in range(1, options['days'] + 1):
+            d = today - timedelta(days=day)
+            cluster.add_index(family + d.strftime(main.INDEX_YMD_FORMAT), docs=1000, body=body,
+                              creation_date=int(d.timestamp() * 1000))
+
+    existing = set(cluster.indices)
+
+    with tempfile.TemporaryDirectory() as tmp, FakeServer(cluster) as server:
+        os.makedirs(os.path.join(tmp, 'etc'))
+        with open(os.path.join(tmp, 'etc', 'es-delete-old-index.conf'), 'w', encoding='utf-8') as f:
+            f.writelines('{} {}\n'.format(family, options['keep_days']) for family in families)
+        main.ROOT_DIR = tmp
+        main.MAPPING_DB = os.path.join(tmp, 'etc', 'all_indices_mapping.db')
+        main.MAPPING_FILE = os.path.join(tmp, 'etc', 'all_indices_mapping.json')
+        main.STATS_FILE = os.path.join(tmp, 'log', 'run.json')
+        main.CREATE_MAX_RATE = options['create_max_rate']
+        main.ES_HTTP_AUTH = None
+
+        if use_async:
+            main.run_async({'bench': server.hosts})
+        else:
+            main.run('bench', server.hosts)
+
+        tomorrow = (today + timedelta(days=1)).strftime(main.INDEX_YMD_FORMAT)
+        # 应保留的索引: 明天新建的, 以及保留天数内的(过期日期当天的索引也删除), 保留天数为 0 时只删除 DEFAULT_DAYS_0 天前当天的
+        if options['keep_days'] > 0:
+            kept_days = range(1, min(options['days'] + 1, options['keep_days']))
+        else:
+            kept_days = [day for day in range(1, options['days'] + 1) if day != main.DEFAULT_DAYS_0]
+        expected = {family + tomorrow for family in families}
+        expected.update(family + (today - timedelta(days=day)).strftime(main.INDEX_YMD_FORMAT)
+                        for family in families for day in kept_days)
+        left = set(cluster.indices)
+        return {
+            'api_calls': cluster.api_calls,
+            'failures': cluster.failures,
+            'calls': dict(sorted(cluster.calls.items())),
+            'checks': {
+                'created': sum(family + tomorrow in cluster.indices for family in families),
+                'expected_created': len(families),
+                # 应删除但仍存在的索引
+                'expired_left': len((existing - expected) & left),
+                # 多删(缺少应保留的索引)或漏删(多出不应保留的索引), 可发现过期日期边界错误
+                'missing': len(expected - left),
+                'unexpected': len(left - expected),
+            },
+        }
+
+
+def bench_main_async(options):
+    return bench_main(options, use_async=True)
+
+
+def bench_reindex(options):
+    """源集群中 indices 个索引, 每个 docs 个文档, 全部迁移到空的目标集群"""
+    from reindex.libs.elasticsearch_reindex import Manager
+
+    source = FakeCluster(latency=options['latency'], seed=options['seed'])
+    for i in range(options['indices']):
+        source.add_index('bench-{:05d}'.format(i), docs=options['docs'])
+    dest = FakeCluster(latency=options['latency'], fail_rate=options['fail_rate'],
+                       reindex_rate=options['reindex_rate'], source=source, seed=options['seed'])
+
+    with FakeServer(source) as source_server, FakeServer(dest) as dest_server:
+        manager = Manager.from_dict({
+            'source_host': source_server.url,
+            'dest_host': dest_server.url,
+            'check_interval': options['check_interval'],
+            'concurrent_tasks': options['concurrent_tasks'],
+            'mode': options['mode'],
+        })
+        manager.start_reindex()
+
+    calls = {'source ' + k: v for k, v in source.calls.items()}
+    calls.update({'dest ' + k: v for k, v in dest.calls.items()})
+    return {
+        'api_calls': source.api_calls + dest.api_calls,
+        'failures': dest.failures,
+        'calls': dict(sorted(calls.items())),
+        'checks': {
+            'migrated': sum(dest.indices.get(name, {}).get('docs') == index['docs']
+                            for name, index in source.indices.items()),
+            'expected_migrated': len(source.indices),
+        },
+    }
+
+
+SCENARIOS = {
+    'main': bench_main,
+    'main_async': bench_main_async,
+    'reindex': bench_reindex,
+}
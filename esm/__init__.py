@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+    __init__.py
+    ~~~~~~~~
+    ES 管理脚本的公共模块
+
+    :author: Fufu, 2026/10/18
+"""
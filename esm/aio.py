@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+    aio.py
+    ~~~~~~~~
+    异步维护引擎: 基于 AsyncElasticsearch, 新建/校验/删除分阶段并发, 一个进程可同时维护多个集群
+
+    :author: Fufu, 2026/10/18
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from elasticsearch import AsyncElasticsearch
+from loguru import logger
+
+from .plan import (check_create, check_created, check_delete, delete_batches, new_index_confs, new_index_tasks,
+                   split_batches)
+from .retry import already_exists, classify, retry_async
+from .snapshot import CAT_COLUMNS, CREATION_DATE_PATH, IndexSnapshot
+from .stats import RunStats
+from .template import sync_templates_async
+from .throttle import PressureController, health_sample
+from .utils import batch_indexs
+
+
+class AsyncMaintainer:
+    """单个集群的异步维护任务"""
+
+    def __init__(self, name, hosts, http_auth=None, ymd_format='_%y%m%d', create_workers=8, create_max_rate=20.0,
+                 delete_workers=4, wait_timeout=300, default_days_0=190, batch_url_len=3000,
+                 delete_batch_size=50, template_priority=None, es_kwargs=None, stats=None, lookahead=1):
+        self.name = name
+        # 日志前缀
+        self.tag = '[{}] '.format(name)
+        self.hosts = hosts
+        self.http_auth = http_auth
+        self.ymd_format = ymd_format
+        self.create_workers = create_workers
+        self.create_max_rate = create_max_rate
+        self.delete_workers = delete_workers
+        self.wait_timeout = wait_timeout
+        self.default_days_0 = default_days_0
+        self.batch_url_len = batch_url_len
+        self.delete_batch_size = delete_batch_size
+        # 提前新建未来几天的索引
+        self.lookahead = lookahead
+        # 非 None 时相同配置的索引共用可组合索引模板
+        self.template_priority = template_priority
+        # AsyncElasticsearch 初始化参数, 与同步客户端连接池一致
+        self.es_kwargs = es_kwargs or {'max_retries': 3, 'timeout': 30, 'retry_on_timeout': False,
+                                       'maxsize': max(10, create_workers, delete_workers)}
+        # 运行统计, 多个集群可共用, 阶段耗时以集群名为 key
+        self.stats = stats or RunStats()
+        self.es = None
+        self.snapshot = None
+        self.pressure = None
+        # 各阶段的并发限制, 须在事件循环内创建
+        self.create_sem = None
+        self.delete_sem = None
+
+    async def run(self, index_conf, mapping):
+        """新建未来 lookahead 天的索引, 删除过期索引"""
+        self.es = self.stats.instrument(AsyncElasticsearch(self.hosts, **self.es_kwargs))
+        self.create_sem = asyncio.Semaphore(self.create_workers)
+        self.delete_sem = asyncio.Semaphore(self.delete_workers)
+        self.pressure = PressureController(self.probe_cluster, max_rate=self.create_max_rate)
+        try:
+            await self.es.info(http_auth=self.http_auth)
+            with self.stats.span('snapshot', self.name):
+                rows = await self.es.cat.indices(index='*', h=CAT_COLUMNS, bytes='b', format='json',
+                                                 expand_wildcards='all', http_auth=self.http_auth)
+                self.snapshot = IndexSnapshot(rows, ymd_format=self.ymd_format)
+            logger.info('[{}] SNAPSHOT: INDEXS: {}, FAMILIES: {}', self.name, len(self.snapshot),
+                        len(self.snapshot.families))
+
+            logger.info('[{}] create new indexs', self.name)
+            with self.stats.span('create_new_indexs', self.name):
+                await self.create_new_indexs(index_conf, mapping)
+
+            logger.info('[{}] delete old indexs', self.name)
+            with self.stats.span('delete_old_indexs', self.name):
+                await self.delete_old_indexs(index_conf)
+        except Exception as e:
+            # 记录后抛出, 由 run_clusters 汇总失败的集群
+            logger.error('[{}] RUN-ERROR: {}', self.name, e)
+            raise
+        finally:
+            await self.es.close()
+
+    async def create_new_indexs(self, index_conf, mapping):
+        """新建索引"""
+        today = datetime.now()
+        yesterday = today + timedelta(days=-1)
+
+        # 取昨天的索引配置, 补漏可能存在于待删除列表的索引, 使用模板时保留 settings
+        index_yesterday = '*' + yesterday.strftime(self.ymd_format)
+        indexs = await self.es.indices.get(index=index_yesterday, http_auth=self.http_auth)
+        use_templates = self.template_priority is not None
+        confs = new_index_confs(indexs, self.snapshot, mapping, index_conf, keep_settings=use_templates)
+        if use_templates:
+            confs = await self.apply_templates(confs)
+
+        tasks = new_index_tasks(self.snapshot, confs, today, self.lookahead, tag=self.tag)
+        if not tasks:
+            return
+        # 单个索引出错时按错误类型退避重试, 4xx 不重试
+        failed = await self.create_indexs(tasks)
+        if failed:
+            logger.error('[{}] NEW-FAILED: {}', self.name, [cfg[0] for cfg in failed])
+
+    async def apply_templates(self, confs):
+        """按配置分组新建/更新可组合索引模板, 已由模板覆盖的索引配置置空"""
+        return await sync_templates_async(self.es, confs, self.snapshot.families, self.ymd_format,
+                                          self.template_priority, http_auth=self.http_auth, tag=self.tag)
+
+    async def create_indexs(self, tasks):
+        """并发新建索引并批量校验, 返回创建失败的索引列表"""
+        logger.info('[{}] NEW-INDEXS: {}, WORKERS: {}', self.name, len(tasks), self.create_workers)
+        await asyncio.gather(*(self.create_index(*cfg) for cfg in tasks))
+
+        await self.load_index_dates([cfg[0] for cfg in tasks])
+        return check_created(self.snapshot, tasks, tag=self.tag)
+
+    async def create_index(self, index_b, conf):
+        """建明天的索引, 出错时按错误类型退避重试"""
+        try:
+            with self.stats.span('create_index', index_b):
+                return await retry_async(index_b, self._create_index, index_b, conf,
+                                         tag='[{}] NEW-RETRY'.format(self.name))
+        except Exception:
+            return False
+
+    async def _create_index(self, index_b, conf):
+        async with self.create_sem:
+            if self.snapshot.creation_date(index_b):
+                logger.info('[{}] EXISTS: {}', self.name, index_b)
+                return True
+
+            # 按 Master 压力限速
+            with self.stats.span('pressure_wait'):
+                await self.pressure.acquire_async()
+
+            try:
+                res = await self.es.indices.create(index=index_b, timeout='{}s'.format(self.wait_timeout),
+                                                   wait_for_active_shards=1,
+                                                   request_timeout=self.wait_timeout + 10,
+                                                   http_auth=self.http_auth, body=conf)
+            except Exception as e:
+                if already_exists(e):
+                    logger.info('[{}] EXISTS: {}', self.name, index_b)
+                    return True
+                if classify(e) in ('timeout', 'throttle'):
+                    self.pressure.backoff()
+                    self.stats.incr('pressure_backoff')
+                raise
+            return check_create(res, index_b, tag=self.tag)
+
+    async def probe_cluster(self):
+        """采样集群压力"""
+        return health_sample(await self.es.cluster.health(http_auth=self.http_auth))
+
+    async def load_index_dates(self, indexs):
+        """批量获取索引创建时间, 结果写入快照"""
+        for names in batch_indexs(indexs, max_len=self.batch_url_len):
+            try:
+                res = await self.es.indices.get(index=names, ignore_unavailable=True, allow_no_indices=True,
+                                                filter_path=CREATION_DATE_PATH, http_auth=self.http_auth)
+            except Exception as e:
+                logger.error('[{}] CHECK-INDEX: {}', self.name, e)
+                continue
+            self.snapshot.add_creation_dates(res)
+
+    async def delete_old_indexs(self, index_conf):
+        """按配置删除所有过期的旧索引"""
+        batches = delete_batches(self.snapshot, index_conf, datetime.now().date(), self.default_days_0,
+                                 self.batch_url_len, self.delete_batch_size, tag=self.tag)
+        if not batches:
+            return
+
+        results = await asyncio.gather(*(self.delete_index(names) for names in batches))
+        failed, singles = split_batches([names for names, ok in zip(batches, results) if not ok], tag=self.tag)
+        if singles:
+            results = await asyncio.gather(*(self.delete_index(index) for index in singles))
+            failed.extend(index for index, ok in zip(singles, results) if not ok)
+        if failed:
+            logger.error('[{}] DELETE-FAILED: {}', self.name, failed)
+
+    async def delete_index(self, names):
+        """删除一批索引(逗号分隔), 出错时按错误类型退避重试"""
+        try:
+            with self.stats.span('delete_index', names):
+                await retry_async(names, self._delete_index, names, tag='[{}] DELETE-RETRY'.format(self.name))
+        except Exception:
+            return False
+
+        for index in names.split(','):
+            self.snapshot.discard(index)
+        return True
+
+    async def _delete_index(self, names):
+        async with self.delete_sem:
+            res = await self.es.indices.delete(index=names, timeout='{}s'.format(self.wait_timeout), ignore=404,
+                                               ignore_unavailable=True, request_timeout=self.wait_timeout + 10,
+                                               http_auth=self.http_auth)
+            return check_delete(res, names, tag=self.tag)
+
+
+async def run_clusters(maintainers, index_conf, mappings):
+    """并发维护多个集群, 单个集群出错不影响其他集群, 返回出错的集群名称
+
+    :param mappings: {集群名称: 索引配置存储}, 各集群的配置分开保存
+    """
+    results = await asyncio.gather(*(m.run(index_conf, mappings[m.name]) for m in maintainers),
+                                   return_exceptions=True)
+    return [m.name for m, res in zip(maintainers, results) if isinstance(res, BaseException)]
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+    conf.py
+    ~~~~~~~~
+    索引保留天数配置: 配置中心条件请求, 内存缓存, 内容变化时才写本地文件, 失败时使用上次的本地文件
+
+    :author: Fufu, 2026/10/18
+"""
+import json
+import os
+import threading
+import time
+from hashlib import md5
+
+import requests
+from loguru import logger
+
+from .stats import RunStats
+
+
+def parse_conf(text, default_days=7):
+    """解析配置, 每行: 索引名称 保留天数(缺省或无效时为 default_days), # 开头为注释
+
+    保留天数原样返回, 0 由删除时按 DEFAULT_DAYS_0(190 天)处理, 只删除当天的索引, 见 IndexSnapshot.expired_indexs
+    """
+    res = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        index, _, days = line.partition(' ')
+        try:
+            res[index] = int(days.strip())
+        except ValueError:
+            res[index] = default_days
+    return res
+
+
+def content_hash(text):
+    return md5(text.encode('utf-8')).hexdigest()
+
+
+class RetentionConf:
+    """索引保留天数配置
+
+    - TTL 内直接返回内存中解析好的配置, 一轮运行只请求一次配置中心
+    - 请求带超时和 If-None-Match/If-Modified-Since, 304 时沿用本地文件, 验证信息保存在 <path>.meta
+    - 内容哈希变化时才写文件(先写临时文件再替换), 请求失败或返回内容无效时使用上次的本地文件
+
+    :param url: 配置中心地址, 为空时只读本地文件
+    :param timeout: 请求超时(秒), (连接超时, 读取超时)
+    """
+
+    def __init__(self, path, url=None, timeout=(3, 10), ttl=600, default_days=7, stats=None):
+        self.path = path
+        self.url = url
+        self.timeout = timeout
+        self.ttl = ttl
+        self.default_days = default_days
+        self.stats = stats or RunStats()
+        self.meta_path = path + '.meta'
+        self.session = requests.Session()
+        self._conf = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        """获取配置 {索引名称: 保留天数}, 过期时刷新"""
+        with self._lock:
+            if self._conf is None or time.monotonic() - self._loaded_at >= self.ttl:
+                self._refresh()
+            return dict(self._conf)
+
+    def _refresh(self):
+        meta = self._load_meta()
+        text = self._fetch(meta) if self.url else None
+        if text is not None:
+            h = content_hash(text)
+            conf = parse_conf(text, self.default_days)
+            if not conf:
+                logger.error('CONF: {} EMPTY, use last good copy', self.url)
+            elif h == meta.get('hash') and os.path.isfile(self.path):
+                self._set(conf)
+                self._save_meta(meta)
+                return
+            elif self._write(text):
+                meta['hash'] = h
+                self._set(conf)
+                self._save_meta(meta)
+                logger.info('CONF-UPDATED: {}, INDEXS: {}', self.path, len(conf))
+                return
+
+        # 未配置远程, 304, 请求失败: 读取本地文件
+        conf = self._read()
+        if conf is not None:
+            self._set(conf)
+        elif self._conf is None:
+            self._set({})
+        else:
+            # 本地文件也不可用时继续使用内存中的配置, 稍后重试
+            self._loaded_at = time.monotonic()
+
+    def _set(self, conf):
+        self._conf = conf
+        self._loaded_at = time.monotonic()
+
+    def _fetch(self, meta):
+        """请求配置中心, 返回配置文本, 未变化(304)或失败时返回 None"""
+        headers = {}
+        if os.path.isfile(self.path):
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        try:
+            with self.stats.span('conf_center'):
+                resp = self.session.get(self.url, headers=headers, timeout=self.timeout)
+            if resp.status_code == 304:
+                logger.info('CONF: NOT MODIFIED')
+                return None
+            resp.raise_for_status()
+            data = resp.json()
+            if data['ok'] != 1:
+                logger.error('CONF: {}', data)
+                return None
+            text = data['data'][0]['ip_info']
+        except Exception as e:
+            logger.error('CONF: {}', e)
+            return None
+
+        meta['etag'] = resp.headers.get('ETag')
+        meta['last_modified'] = resp.headers.get('Last-Modified')
+        return text
+
+    def _read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return parse_conf(f.read(), self.default_days)
+        except Exception as e:
+            logger.error('CONF: {}', e)
+            return None
+
+    def _write(self, text):
+        tmp = '{}.{}.tmp'.format(self.path, os.getpid())
+        try:
+            with open(tmp, 'w', encoding='utf-8', newline='\n') as f:
+                f.write(text)
+            os.replace(tmp, self.path)
+            return True
+        except Exception as e:
+            logger.error('CONF-WRITE: {} {}', self.path, e)
+            return False
+
+    def _load_meta(self):
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _save_meta(self, meta):
+        try:
+            with open(self.meta_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+        except Exception as e:
+            logger.error('CONF-META: {} {}', self.meta_path, e)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+    mapping.py
+    ~~~~~~~~
+    索引配置存储(sqlite): 按内容哈希保存, 仅写入变化的条目, 按需加载
+
+    :author: Fufu, 2026/10/18
+"""
+import json
+import os
+import sqlite3
+import time
+from hashlib import md5
+
+from loguru import logger
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS bodies (
+    hash TEXT PRIMARY KEY,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS families (
+    name TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+'''
+
+
+def fingerprint(conf):
+    """索引配置的内容哈希, 与键顺序无关"""
+    data = json.dumps(conf, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return md5(data.encode('utf-8')).hexdigest()
+
+
+class MappingStore:
+    """索引配置存储
+
+    - 启动时只加载 {索引名称: 哈希}, 配置内容在 get 时按需读取
+    - 写入先缓存, flush 时在一个事务中只写入哈希变化的条目, 中途崩溃不会损坏已有数据
+    - 首次使用时自动导入旧版 JSON 文件
+    """
+
+    def __init__(self, path, legacy_file=None):
+        self.path = path
+        self.conn = self._connect()
+        self._hashes = dict(self.conn.execute('SELECT name, hash FROM families'))
+        self._pending = {}
+        if not self._hashes and legacy_file and os.path.isfile(legacy_file):
+            self._import_json(legacy_file)
+
+    def _connect(self):
+        try:
+            conn = sqlite3.connect(self.path)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            return conn
+        except sqlite3.DatabaseError as e:
+            # 文件损坏时移走备查, 重建空库, 本轮会从昨天的索引重新保存配置
+            broken = '{}.broken.{}'.format(self.path, int(time.time()))
+            logger.error('MAPPING-DB: {} {}, moved to {}', self.path, e, broken)
+            os.replace(self.path, broken)
+            conn = sqlite3.connect(self.path)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            return conn
+
+    def _import_json(self, legacy_file):
+        try:
+            with open(legacy_file, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error('MAPPING-IMPORT: {} {}', legacy_file, e)
+            return
+        self._pending.update(data)
+        logger.info('MAPPING-IMPORT: {}, FAMILIES: {}', legacy_file, self.flush())
+
+    def __len__(self):
+        return len(self._hashes.keys() | self._pending.keys())
+
+    def __setitem__(self, name, conf):
+        self._pending[name] = conf
+
+    def groups(self):
+        """已保存的配置按哈希分组, {哈希: [索引名称, ...]}"""
+        res = {}
+        for name, h in self._hashes.items():
+            res.setdefault(h, []).append(name)
+        return res
+
+    def get(self, name, default=None):
+        """按需读取索引配置"""
+        if name in self._pending:
+            return self._pending[name]
+        h = self._hashes.get(name)
+        if h is None:
+            return default
+        row = self.conn.execute('SELECT body FROM bodies WHERE hash = ?', (h,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def flush(self):
+        """在一个事务中写入变化的条目, 返回写入数"""
+        changed = {}
+        for name, conf in self._pending.items():
+            h = fingerprint(conf)
+            if self._hashes.get(name) != h:
+                changed[name] = (h, conf)
+        self._pending.clear()
+        if not changed:
+            return 0
+
+        now = int(time.time())
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO bodies (hash, body) VALUES (?, ?)',
+                [(h, json.dumps(conf, ensure_ascii=False, separators=(',', ':'))) for h, conf in changed.values()])
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO families (name, hash, updated_at) VALUES (?, ?, ?)',
+                [(name, h, now) for name, (h, _) in changed.items()])
+            # 清理不再被引用的配置
+            self.conn.execute('DELETE FROM bodies WHERE hash NOT IN (SELECT hash FROM families)')
+        self._hashes.update({name: h for name, (h, _) in changed.items()})
+        return len(changed)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+    plan.py
+    ~~~~~~~~
+    新建/删除索引的规划和结果校验, 不发请求, 同步(main.py)和异步(esm.aio)引擎共用
+
+    :param tag: 日志前缀, 异步引擎为 '[集群名] '
+
+    :author: Fufu, 2026/10/18
+"""
+from datetime import datetime, timedelta
+
+from loguru import logger
+
+from .utils import batch_indexs
+
+
+def new_index_confs(indexs, snapshot, mapping, index_conf, keep_settings=False):
+    """新建索引的配置: 昨天的索引配置, 补齐配置文件中的索引
+
+    :param indexs: 昨天的索引(GET *<昨天后缀> 的结果), 配置(不含 settings)写入 mapping
+    :param index_conf: {索引名称: 保留天数}, 可能存在于待删除列表但昨天没有索引
+    :param keep_settings: 保留 settings, 使用模板时模板须带上 settings
+    :return: {索引名称: 配置}
+    """
+    confs = {}
+    for index, conf in indexs.items():
+        index_title = snapshot.parse(index)[0]
+        settings = conf.pop('settings', None)
+        mapping[index_title] = conf
+        confs[index_title] = dict(conf, settings=settings) if keep_settings and settings else conf
+
+    for index_title in index_conf:
+        if index_title not in confs:
+            confs[index_title] = mapping.get(index_title, {})
+
+    return confs
+
+
+def new_index_tasks(snapshot, confs, today, days, quota=None, tag=''):
+    """未来 days 天缺失的索引
+
+    :param quota: quota(日期, 待建数) 返回本次最多新建的索引数, 为 None 时全部新建
+    :return: [[索引, 配置], ...]
+    """
+    tasks = []
+    for n in range(1, days + 1):
+        day = (today + timedelta(days=n)).date()
+        missing = [[snapshot.index_name(index_title, day), confs[index_title]]
+                   for index_title in snapshot.missing(confs, day)]
+        if quota is not None and missing:
+            limit = quota(day, len(missing))
+            logger.info('{}NEW-PLAN: {}, MISSING: {}, NOW: {}', tag, day, len(missing), limit)
+            missing = missing[:limit]
+        tasks.extend(missing)
+
+    return tasks
+
+
+def check_create(res, index_b, tag=''):
+    """新建索引的结果, wait_for_active_shards=1 时主分片在超时前就绪则 shards_acknowledged 为 True"""
+    logger.info('{}NEW-RESULT: {}, OK: {}', tag, index_b, res.get('acknowledged'))
+    if not res.get('shards_acknowledged'):
+        logger.info('{}NEW-WAIT: {} TIMEOUT', tag, index_b)
+        return False
+
+    return True
+
+
+def check_created(snapshot, tasks, tag=''):
+    """批量校验新建结果(创建时间已写入快照), 返回创建失败的索引列表"""
+    failed = []
+    for index_b, conf in tasks:
+        creation_date = snapshot.creation_date(index_b)
+        if creation_date:
+            logger.info('{}NEW-END: {} {}', tag, index_b, datetime.fromtimestamp(creation_date / 1000).isoformat())
+        else:
+            logger.info('{}NEW-CHECK: {} NONE', tag, index_b)
+            failed.append([index_b, conf])
+
+    return failed
+
+
+def delete_batches(snapshot, index_conf, today, default_days_0, max_len, max_count, tag=''):
+    """所有过期索引按 URL 长度和个数分批"""
+    old_indexs = snapshot.expired_indexs(index_conf, today, default_days_0)
+    batches = list(batch_indexs(old_indexs, max_len=max_len, max_count=max_count))
+    if batches:
+        logger.info('{}DELETE-INDEX: {}, BATCHES: {}', tag, len(old_indexs), len(batches))
+
+    return batches
+
+
+def check_delete(res, names, tag=''):
+    """删除索引的结果, 索引已不存在(404)视为成功"""
+    if res.get('status') != 404 and not res.get('acknowledged'):
+        logger.warning('{}DELETE-NOT-ACKNOWLEDGED: {}', tag, names)
+        return False
+
+    logger.info('{}DELETE-OK: {}', tag, names)
+    return True
+
+
+def split_batches(failed, tag=''):
+    """批次中任一索引出错(如正在快照)时整批失败, 拆开逐个删除, 只有真正失败的索引计入结果
+
+    :return: (最终失败的单个索引批次, 待逐个删除的索引)
+    """
+    singles = [index for names in failed if ',' in names for index in names.split(',')]
+    if singles:
+        logger.warning('{}DELETE-SPLIT: {}', tag, len(singles))
+
+    return [names for names in failed if ',' not in names], singles
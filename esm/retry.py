@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+    retry.py
+    ~~~~~~~~
+    重试调度: 按错误类型指数退避加随机抖动, 失败项与正常项并行执行
+
+    :author: Fufu, 2026/10/18
+"""
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from elasticsearch import exceptions
+from loguru import logger
+
+
+class OperationFailed(Exception):
+    """操作返回 False 时用于重试调度的错误"""
+
+
+class RetryPolicy:
+    """退避策略: 第 n 次重试等待 min(cap, base * 2^n), 再乘以 [0.5, 1) 的随机抖动"""
+
+    def __init__(self, base, cap, max_retries):
+        self.base = base
+        self.cap = cap
+        self.max_retries = max_retries
+
+    def delay(self, attempt):
+        backoff = min(self.cap, self.base * 2 ** attempt)
+        return backoff * random.uniform(0.5, 1)
+
+
+# 按错误类型的默认重试策略
+DEFAULT_POLICIES = {
+    # 请求超时, Master 可能繁忙
+    'timeout': RetryPolicy(base=5, cap=120, max_retries=5),
+    # 429 限流, 退避更久
+    'throttle': RetryPolicy(base=10, cap=300, max_retries=8),
+    # 5xx 服务端错误
+    'server': RetryPolicy(base=2, cap=60, max_retries=5),
+    # 连接失败
+    'connection': RetryPolicy(base=1, cap=30, max_retries=5),
+    # 400 等客户端错误, 重试无意义
+    'client': RetryPolicy(base=0, cap=0, max_retries=0),
+    'other': RetryPolicy(base=5, cap=60, max_retries=5),
+}
+
+
+def classify(e):
+    """错误分类"""
+    if isinstance(e, exceptions.ConnectionTimeout):
+        return 'timeout'
+    if isinstance(e, exceptions.ConnectionError):
+        return 'connection'
+    if isinstance(e, exceptions.TransportError) and isinstance(e.status_code, int):
+        if e.status_code == 429:
+            return 'throttle'
+        if e.status_code in (408, 504):
+            return 'timeout'
+        if e.status_code >= 500:
+            return 'server'
+        if e.status_code >= 400:
+            return 'client'
+    return 'other'
+
+
+def already_exists(e):
+    """新建索引时索引已存在, 视为成功"""
+    return isinstance(e, exceptions.RequestError) and e.error == 'resource_already_exists_exception'
+
+
+class _Item:
+    __slots__ = ('key', 'func', 'args', 'attempt')
+
+    def __init__(self, key, func, args):
+        self.key = key
+        self.func = func
+        self.args = args
+        self.attempt = 0
+
+
+class RetryScheduler:
+    """以到期时间为优先级的待执行队列, 线程池并发执行, 失败项退避后重新入队"""
+
+    def __init__(self, workers, policies=None, tag='RETRY'):
+        self.workers = max(1, workers)
+        self.policies = policies or DEFAULT_POLICIES
+        self.tag = tag
+        self._queue = []
+        self._seq = itertools.count()
+
+    def add(self, key, func, *args, delay=0):
+        """加入待执行操作, 操作抛出异常或返回 False 视为失败"""
+        self._push(_Item(key, func, args), delay)
+
+    def _push(self, item, delay):
+        heapq.heappush(self._queue, (time.monotonic() + delay, next(self._seq), item))
+
+    def run(self):
+        """执行至队列为空, 返回 ({key: 结果}, {key: 最后一次错误})"""
+        results, failed = {}, {}
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while self._queue or running:
+                now = time.monotonic()
+                while self._queue and self._queue[0][0] <= now and len(running) < self.workers:
+                    item = heapq.heappop(self._queue)[2]
+                    running[executor.submit(item.func, *item.args)] = item
+
+                # 等待任一操作完成或下一个重试项到期
+                timeout = None
+                if self._queue and len(running) < self.workers:
+                    timeout = max(0, self._queue[0][0] - now)
+                if not running:
+                    time.sleep(timeout)
+                    continue
+
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = running.pop(future)
+                    try:
+                        res = future.result()
+                        if res is False:
+                            raise OperationFailed(item.key)
+                    except Exception as e:
+                        err = self.retry(item, e)
+                        if err:
+                            failed[item.key] = err
+                        continue
+                    results[item.key] = res
+
+        return results, failed
+
+    def retry(self, item, e):
+        """失败项按策略退避重新入队, 超过重试次数时返回错误"""
+        kind = classify(e)
+        policy = self.policies.get(kind, self.policies['other'])
+        if item.attempt >= policy.max_retries:
+            logger.error('{}-GIVEUP({}): {} {}', self.tag, kind, item.key, e)
+            return e
+
+        delay = policy.delay(item.attempt)
+        item.attempt += 1
+        logger.warning('{}({}): {} {}, attempt: {}, wait: {:.1f}s', self.tag, kind, item.key, e, item.attempt, delay)
+        self._push(item, delay)
+        return None
+
+
+async def retry_async(key, func, *args, policies=None, tag='RETRY'):
+    """异步执行并按错误类型退避重试, 各协程的重试互不阻塞, 最终失败时抛出最后一次错误"""
+    policies = policies or DEFAULT_POLICIES
+    attempt = 0
+    while True:
+        try:
+            res = await func(*args)
+            if res is False:
+                raise OperationFailed(key)
+            return res
+        except Exception as e:
+            kind = classify(e)
+            policy = policies.get(kind, policies['other'])
+            if attempt >= policy.max_retries:
+                logger.error('{}-GIVEUP({}): {} {}', tag, kind, key, e)
+                raise
+            delay = policy.delay(attempt)
+            attempt += 1
+            logger.warning('{}({}): {} {}, attempt: {}, wait: {:.1f}s', tag, kind, key, e, attempt, delay)
+            await asyncio.sleep(delay)
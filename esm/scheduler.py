@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+    scheduler.py
+    ~~~~~~~~
+    常驻模式的调度: 提前新建的索引分摊到各轮执行, 删除过期索引在低峰时段执行
+
+    :author: Fufu, 2026/10/18
+"""
+import math
+from datetime import datetime, time, timedelta
+
+
+def parse_hours(text):
+    """解析小时范围, 如: 2-5,23 -> {2, 3, 4, 23}, 与 reindex 限速时段一致, 结束小时不包含在内, 22-2 表示跨零点"""
+    hours = set()
+    for part in (text or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition('-')
+        start = int(start)
+        end = int(end) % 24 if end else (start + 1) % 24
+        if not (0 <= start <= 23) or start == end:
+            raise ValueError('invalid hours: {}'.format(part))
+        h = start
+        while h != end:
+            hours.add(h)
+            h = (h + 1) % 24
+    return hours
+
+
+class DailySchedule:
+    """单个集群的每日调度
+
+    - 未来 lookahead 天的索引, 每天的待建索引均匀分摊到截止时间(当天零点前 margin 秒)之前的各轮
+    - 删除过期索引每天执行一次, 只在 delete_hours 内执行, 为空时不限时段
+
+    :param interval: 每轮间隔(秒)
+    """
+
+    def __init__(self, interval, lookahead=2, margin=3600, delete_hours=None):
+        self.interval = interval
+        self.lookahead = lookahead
+        self.margin = margin
+        self.delete_hours = delete_hours or set()
+        self.deleted_on = None
+
+    def create_quota(self, day, missing, now=None):
+        """本轮最多新建的 day 的索引数"""
+        now = now or datetime.now()
+        deadline = datetime.combine(day, time()) - timedelta(seconds=self.margin)
+        rounds = int((deadline - now).total_seconds() // self.interval) + 1
+        if rounds <= 1:
+            return missing
+        return math.ceil(missing / rounds)
+
+    def should_delete(self, now=None):
+        now = now or datetime.now()
+        if self.deleted_on == now.date():
+            return False
+        return not self.delete_hours or now.hour in self.delete_hours
+
+    def mark_deleted(self, now=None):
+        self.deleted_on = (now or datetime.now()).date()
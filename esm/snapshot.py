@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+    snapshot.py
+    ~~~~~~~~
+    索引快照: 一次 _cat/indices 解析为按索引名称(不含日期后缀)分组的有序日期数组
+
+    :author: Fufu, 2026/10/18
+"""
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, datetime, timedelta
+
+CAT_COLUMNS = 'index,creation.date,docs.count,store.size'
+# 批量获取索引创建时间: GET <索引,...>?filter_path=...
+CREATION_DATE_PATH = '*.settings.index.creation_date'
+
+
+class IndexSnapshot:
+    """索引快照
+
+    - 日期索引按名称分组, 日期以 ordinal 整数存于有序数组, 存在/缺失/过期均为二分查找
+    - 每个索引的创建时间(毫秒), 文档数, 存储大小(字节)
+    """
+
+    def __init__(self, rows=(), ymd_format='_%y%m%d'):
+        self.ymd_format = ymd_format
+        self.suffix_len = len(date.today().strftime(ymd_format))
+        # {索引名称: array(日期 ordinal)}
+        self._dates = {}
+        # {索引: (创建时间, 文档数, 存储大小)}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+        dates = {}
+        for row in rows:
+            index = row['index']
+            self._stats[index] = (to_int(row.get('creation.date')), to_int(row.get('docs.count')),
+                                  to_int(row.get('store.size')))
+            parsed = self.parse(index)
+            if parsed:
+                dates.setdefault(parsed[0], []).append(parsed[1].toordinal())
+
+        for family, ordinals in dates.items():
+            self._dates[family] = array('l', sorted(ordinals))
+
+    @classmethod
+    def from_es(cls, es, index='*', http_auth=None, ymd_format='_%y%m%d'):
+        """一次 _cat/indices 请求生成快照"""
+        rows = es.cat.indices(index=index, h=CAT_COLUMNS, bytes='b', format='json',
+                              expand_wildcards='all', http_auth=http_auth)
+        return cls(rows, ymd_format=ymd_format)
+
+    def __len__(self):
+        return len(self._stats)
+
+    @property
+    def families(self):
+        """所有带日期后缀的索引名称"""
+        return list(self._dates)
+
+    def parse(self, index):
+        """拆分索引为 (名称, 日期), 无日期后缀时返回 None"""
+        if len(index) <= self.suffix_len:
+            return None
+        try:
+            return index[:-self.suffix_len], datetime.strptime(index[-self.suffix_len:], self.ymd_format).date()
+        except ValueError:
+            return None
+
+    def index_name(self, family, day):
+        """拼接索引名称和日期"""
+        return family + day.strftime(self.ymd_format)
+
+    def creation_date(self, index):
+        """索引创建时间(毫秒), 0 表示不存在"""
+        return self._stats.get(index, (0, 0, 0))[0]
+
+    def exists(self, family, day):
+        """指定日期的索引是否存在"""
+        ordinals = self._dates.get(family)
+        if not ordinals:
+            return False
+        x = day.toordinal()
+        i = bisect_left(ordinals, x)
+        return i < len(ordinals) and ordinals[i] == x
+
+    def missing(self, families, day):
+        """指定日期缺失的索引名称"""
+        return [family for family in families if not self.exists(family, day)]
+
+    def expired(self, family, expire_date):
+        """日期不晚于 expire_date 的所有索引"""
+        ordinals = self._dates.get(family, ())
+        n = bisect_right(ordinals, expire_date.toordinal())
+        return [self.index_name(family, date.fromordinal(x)) for x in ordinals[:n]]
+
+    def expired_indexs(self, index_conf, today, default_days_0):
+        """按保留天数计算所有过期的索引, 包括以往漏删的
+
+        :param index_conf: {索引名称: 保留天数}, 保留天数不大于 0 时与旧版一致,
+            只删除 default_days_0 天前当天的索引, 不补删更早的
+        """
+        old_indexs = []
+        for family, days in index_conf.items():
+            if days <= 0:
+                day = today - timedelta(default_days_0)
+                if self.exists(family, day):
+                    old_indexs.append(self.index_name(family, day))
+                continue
+            old_indexs.extend(self.expired(family, today - timedelta(days)))
+        return old_indexs
+
+    def add(self, index, creation_date, docs_count=0, store_size=0):
+        """记录新建的索引"""
+        with self._lock:
+            exists = index in self._stats
+            self._stats[index] = (to_int(creation_date), docs_count, store_size)
+            parsed = self.parse(index)
+            if parsed and not exists:
+                insort(self._dates.setdefault(parsed[0], array('l')), parsed[1].toordinal())
+
+    def add_creation_dates(self, res):
+        """记录批量获取索引创建时间的结果(filter_path 为 CREATION_DATE_PATH)"""
+        for index, conf in (res or {}).items():
+            creation_date = conf.get('settings', {}).get('index', {}).get('creation_date')
+            if creation_date:
+                self.add(index, creation_date)
+
+    def discard(self, index):
+        """移除已删除的索引"""
+        with self._lock:
+            if self._stats.pop(index, None) is None:
+                return
+            parsed = self.parse(index)
+            if not parsed:
+                return
+            ordinals = self._dates.get(parsed[0])
+            x = parsed[1].toordinal()
+            i = bisect_left(ordinals, x)
+            if i < len(ordinals) and ordinals[i] == x:
+                ordinals.pop(i)
+            if not ordinals:
+                self._dates.pop(parsed[0], None)
+
+
+def to_int(value):
+    """_cat 接口的数值字段可能为 null"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+    stats.py
+    ~~~~~~~~
+    运行统计: 各阶段耗时, 每个 ES 接口的调用次数/错误数/延迟分布, 最慢的索引和请求, 结束时输出 JSON 报告
+
+    :author: Fufu, 2026/10/18
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+from loguru import logger
+
+# 延迟分布的桶上限(秒)
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 30, 60, 300)
+# 每个阶段及全局保留的最慢记录数
+SLOWEST = 10
+
+
+def api_name(method, url):
+    """请求归类, 路径中的索引名/模板名等替换为 {}, 如: GET /_cluster/health/nginx_log_231018 -> GET /_cluster/health/{}"""
+    parts, prev = [], '_'
+    for part in url.split('?', 1)[0].strip('/').split('/'):
+        # 保留 _cat, _cat/indices 等接口名
+        if part and not part.startswith('_') and not (prev.startswith('_') and re.fullmatch(r'[a-z_]+', part)):
+            part = '{}'
+        parts.append(part)
+        prev = part
+    return '{} /{}'.format(method, '/'.join(parts))
+
+
+class _Timer:
+    """耗时累计, 按 key(索引名等)保留最慢的记录"""
+
+    __slots__ = ('count', 'errors', 'seconds', 'max', 'histogram', 'slowest')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.slowest = []
+
+    def add(self, seconds, key=None, error=False, seq=0):
+        self.count += 1
+        self.errors += bool(error)
+        self.seconds += seconds
+        self.max = max(self.max, seconds)
+        self.histogram[sum(seconds > le for le in LATENCY_BUCKETS)] += 1
+        if key is not None:
+            item = (seconds, seq, key)
+            if len(self.slowest) < SLOWEST:
+                heapq.heappush(self.slowest, item)
+            elif item > self.slowest[0]:
+                heapq.heapreplace(self.slowest, item)
+
+    def report(self):
+        res = {
+            'count': self.count,
+            'errors': self.errors,
+            'seconds': round(self.seconds, 3),
+            'avg': round(self.seconds / self.count, 3) if self.count else 0,
+            'max': round(self.max, 3),
+            'histogram': {
+                str(le): n for le, n in zip(LATENCY_BUCKETS + ('+Inf',), self.histogram)
+            },
+        }
+        if self.slowest:
+            res['slowest'] = [[key, round(s, 3)] for s, _, key in sorted(self.slowest, reverse=True)]
+        return res
+
+
+class RunStats:
+    """本次运行的统计, 线程安全
+
+    - span/timed: 阶段耗时, 可按 key(索引名等)记录最慢的调用
+    - instrument: 包装 ES 客户端的 transport.perform_request, 统计每个接口, 同步/异步客户端均可
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._started = time.monotonic()
+        self._phases = {}
+        self._apis = {}
+        self._calls = _Timer()
+        self._counters = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def add_span(self, name, seconds, key=None, error=False):
+        with self._lock:
+            self._phases.setdefault(name, _Timer()).add(seconds, key, error, next(self._seq))
+
+    @contextmanager
+    def span(self, name, key=None):
+        """阶段计时"""
+        start = time.monotonic()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.add_span(name, time.monotonic() - start, key, error)
+
+    def timed(self, name=None, keyed=False):
+        """阶段计时装饰器, keyed 为真时以第一个参数(索引名)为 key 记录最慢的调用"""
+
+        def decorator(func):
+            phase = name or func.__name__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(phase, str(args[0]) if keyed and args else None):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def incr(self, name, n=1):
+        """计数器, 如重试次数"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def add_call(self, method, url, seconds, error=None):
+        """记录一次 ES 请求"""
+        name = api_name(method, url)
+        status = getattr(error, 'status_code', None) if error else 200
+        with self._lock:
+            seq = next(self._seq)
+            self._apis.setdefault(name, _Timer()).add(seconds, error=error is not None)
+            self._calls.add(seconds, '{} {} [{}]'.format(method, url, status), error is not None, seq)
+
+    def instrument(self, client):
+        """统计客户端的所有请求, 重复调用不会重复统计"""
+        transport = client.transport
+        if getattr(transport, 'esm_stats', None) is self:
+            return client
+
+        perform = transport.perform_request
+        if asyncio.iscoroutinefunction(perform):
+            async def perform_request(method, url, *args, **kwargs):
+                start = time.monotonic()
+                error = None
+                try:
+                    return await perform(method, url, *args, **kwargs)
+                except Exception as e:
+                    error = e
+                    raise
+                finally:
+                    self.add_call(method, url, time.monotonic() - start, error)
+        else:
+            def perform_request(method, url, *args, **kwargs):
+                start = time.monotonic()
+                error = None
+                try:
+                    return perform(method, url, *args, **kwargs)
+                except Exception as e:
+                    error = e
+                    raise
+                finally:
+                    self.add_call(method, url, time.monotonic() - start, error)
+
+        transport.perform_request = perform_request
+        transport.esm_stats = self
+        return client
+
+    def report(self):
+        """统计报告"""
+        with self._lock:
+            return {
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'finished_at': datetime.now().isoformat(timespec='seconds'),
+                'seconds': round(time.monotonic() - self._started, 3),
+                'api_calls': self._calls.count,
+                'api_errors': self._calls.errors,
+                'api_seconds': round(self._calls.seconds, 3),
+                'phases': {name: t.report() for name, t in self._phases.items()},
+                'apis': {name: t.report() for name, t in sorted(self._apis.items())},
+                'slowest_calls': self._calls.report().get('slowest', []),
+                'counters': dict(self._counters),
+            }
+
+    def write(self, path):
+        """写入 JSON 报告, 先写临时文件再替换, 不会留下半个文件"""
+        report = self.report()
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.error('STATS: {} {}', path, e)
+            return report
+
+        logger.info('STATS: {}, TOOK: {}s, API: {} calls, {} errors, {}s', path, report['seconds'],
+                    report['api_calls'], report['api_errors'], report['api_seconds'])
+        return report
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+    template.py
+    ~~~~~~~~
+    按配置指纹把索引分组, 每组一个可组合索引模板(_index_template), 新建索引时不再携带配置
+
+    注意: 可组合模板优先于旧版模板(_template), 匹配到的索引不再应用旧版模板中的 settings,
+    所以模板带上昨天索引的 settings(分片数, 副本数, ILM, refresh_interval 等), 不知道 settings 的索引不使用模板
+
+    模板同步的流程(template_steps)与请求方式无关, 同步/异步客户端分别由 sync_templates/sync_templates_async 执行
+
+    :author: Fufu, 2026/10/18
+"""
+from bisect import bisect_left
+
+from loguru import logger
+
+from .mapping import fingerprint
+
+TEMPLATE_PREFIX = 'esm-'
+# 索引自身的 settings, 不能用于模板
+INDEX_ONLY_SETTINGS = ('uuid', 'creation_date', 'provided_name', 'version', 'history', 'resize',
+                       'verified_before_close')
+
+
+def index_pattern(family, ymd_format):
+    """索引名称对应的模板匹配规则, 如: nginx_log_*"""
+    return family + ymd_format.split('%', 1)[0] + '*'
+
+
+def template_settings(settings):
+    """索引 settings(GET <索引> 的结果)中可用于模板的部分, 去掉 uuid, creation_date 等索引自身的配置"""
+    index = dict((settings or {}).get('index') or {})
+    for key in INDEX_ONLY_SETTINGS:
+        index.pop(key, None)
+    return {'index': index} if index else {}
+
+
+def template_body(conf):
+    """索引配置对应的模板内容: mappings, aliases, settings"""
+    return {
+        'mappings': conf['mappings'],
+        'aliases': conf.get('aliases') or {},
+        'settings': template_settings(conf.get('settings')),
+    }
+
+
+def plan_templates(confs, known_families, ymd_format, priority):
+    """规划模板
+
+    :param confs: {索引名称: 配置}, 配置中须有 mappings 和 settings 才使用模板
+    :param known_families: 所有已知索引名称, 用于排除匹配规则会误匹配其他组索引的名称
+    :return: ({模板名: 模板}, {索引名称: 模板名})
+    """
+    groups, bodies = {}, {}
+    for family, conf in confs.items():
+        if conf.get('mappings') and conf.get('settings'):
+            body = template_body(conf)
+            h = fingerprint(body)
+            groups.setdefault(h, []).append(family)
+            bodies[h] = body
+    group_of = {family: h for h, families in groups.items() for family in families}
+
+    # 如 x_* 会匹配到 x_web_*, 两者配置不同时 x 不使用模板
+    known = sorted(set(known_families) | set(confs))
+    excluded = set()
+    for family, h in group_of.items():
+        prefix = index_pattern(family, ymd_format)[:-1]
+        i = bisect_left(known, prefix)
+        while i < len(known) and known[i].startswith(prefix):
+            if known[i] != family and group_of.get(known[i]) != h:
+                excluded.add(family)
+                break
+            i += 1
+
+    templates, covered = {}, {}
+    for h, families in groups.items():
+        families = sorted(f for f in families if f not in excluded)
+        if not families:
+            continue
+        name = TEMPLATE_PREFIX + h[:16]
+        body = {
+            'index_patterns': [index_pattern(f, ymd_format) for f in families],
+            'priority': priority,
+            'template': bodies[h],
+        }
+        body['_meta'] = {'managed_by': 'esmanager', 'fingerprint': fingerprint(body)}
+        templates[name] = body
+        covered.update({f: name for f in families})
+
+    return templates, covered
+
+
+def diff_templates(existing, templates):
+    """对比现有模板(GET _index_template/esm-* 的结果)
+
+    :return: (待删除的模板名, 待新建/更新的模板名, 无变化的模板名)
+    """
+    current = {
+        t['name']: t['index_template'].get('_meta', {}).get('fingerprint')
+        for t in (existing or {}).get('index_templates', [])
+    }
+    to_delete = sorted(current.keys() - templates.keys())
+    unchanged = {name for name, body in templates.items() if current.get(name) == body['_meta']['fingerprint']}
+    to_put = sorted(templates.keys() - unchanged)
+    return to_delete, to_put, unchanged
+
+
+def template_steps(confs, known_families, ymd_format, priority, tag=''):
+    """模板同步流程: 规划, 对比现有模板, 删除多余的, 新建/更新有变化的
+
+    逐步生成 (es.indices 的方法名, 参数), 由调用方执行后 send 回结果, 出错时 throw 回异常
+
+    :return: 新建索引时使用的配置, 已由模板覆盖的索引配置置空, 其余的去掉 settings(仍由旧版模板决定)
+    """
+    templates, covered = plan_templates(confs, known_families, ymd_format, priority)
+    try:
+        existing = yield 'get_index_template', {'name': TEMPLATE_PREFIX + '*', 'ignore': 404}
+        to_delete, to_put, ok = diff_templates(existing, templates)
+        for name in to_delete:
+            yield 'delete_index_template', {'name': name}
+            logger.info('{}TEMPLATE-DELETE: {}', tag, name)
+    except Exception as e:
+        logger.error('{}TEMPLATE: {}', tag, e)
+        return without_settings(confs)
+
+    for name in to_put:
+        try:
+            yield 'put_index_template', {'name': name, 'body': templates[name]}
+            ok.add(name)
+            logger.info('{}TEMPLATE-PUT: {} {}', tag, name, templates[name]['index_patterns'])
+        except Exception as e:
+            logger.error('{}TEMPLATE-PUT: {} {}', tag, name, e)
+
+    logger.info('{}TEMPLATES: {}, FAMILIES: {}/{}', tag, len(ok), sum(covered[f] in ok for f in covered), len(confs))
+    return {index_title: {} if covered.get(index_title) in ok else conf
+            for index_title, conf in without_settings(confs).items()}
+
+
+def without_settings(confs):
+    return {index_title: {k: v for k, v in conf.items() if k != 'settings'} for index_title, conf in confs.items()}
+
+
+def sync_templates(es, confs, known_families, ymd_format, priority, http_auth=None, tag=''):
+    """同步客户端执行模板同步"""
+    steps = template_steps(confs, known_families, ymd_format, priority, tag)
+    res = err = None
+    while True:
+        try:
+            method, kwargs = steps.throw(err) if err else steps.send(res)
+        except StopIteration as e:
+            return e.value
+        try:
+            res, err = getattr(es.indices, method)(http_auth=http_auth, **kwargs), None
+        except Exception as e:
+            res, err = None, e
+
+
+async def sync_templates_async(es, confs, known_families, ymd_format, priority, http_auth=None, tag=''):
+    """异步客户端执行模板同步"""
+    steps = template_steps(confs, known_families, ymd_format, priority, tag)
+    res = err = None
+    while True:
+        try:
+            method, kwargs = steps.throw(err) if err else steps.send(res)
+        except StopIteration as e:
+            return e.value
+        try:
+            res, err = await getattr(es.indices, method)(http_auth=http_auth, **kwargs), None
+        except Exception as e:
+            res, err = None, e
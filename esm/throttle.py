@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+    throttle.py
+    ~~~~~~~~
+    集群压力感知限速: 根据 Master 待处理任务数/排队时长/健康状态自适应调整建索引速率(AIMD)
+
+    :author: Fufu, 2026/10/18
+"""
+import asyncio
+import threading
+import time
+
+from loguru import logger
+
+
+def health_sample(res):
+    """从 _cluster/health 结果中提取压力指标"""
+    return {
+        'pending': res.get('number_of_pending_tasks', 0),
+        'wait_ms': res.get('task_max_waiting_in_queue_millis', 0),
+        'status': res.get('status', 'green'),
+    }
+
+
+class PressureController:
+    """建索引速率控制器
+
+    - Master 空闲(待处理任务数不超过 pending_low)时, 每次采样加速 50%(至少 step 个/秒)
+    - 待处理任务数超过 pending_high, 排队超过 wait_high_ms 或集群为 red 时速率减半
+    - 请求出现超时/限流时由调用方 backoff() 立即减半
+    - probe 返回 health_sample 格式的指标, 异步模式下为协程函数
+    """
+
+    def __init__(self, probe, start_rate=5.0, min_rate=0.2, max_rate=20.0, step=1.0, pending_low=2,
+                 pending_high=50, wait_high_ms=5000, probe_interval=1.0):
+        self.probe = probe
+        self.rate = start_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.step = step
+        self.pending_low = pending_low
+        self.pending_high = pending_high
+        self.wait_high_ms = wait_high_ms
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._probed_at = 0.0
+
+    def acquire(self):
+        """等待下一个建索引时间槽, 必要时先采样集群压力"""
+        with self._lock:
+            if time.monotonic() - self._probed_at >= self.probe_interval:
+                self._probed_at = time.monotonic()
+                try:
+                    self.update(self.probe())
+                except Exception as e:
+                    logger.error('PRESSURE-PROBE: {}', e)
+                    self.backoff()
+            delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        """异步等待下一个建索引时间槽"""
+        if time.monotonic() - self._probed_at >= self.probe_interval:
+            self._probed_at = time.monotonic()
+            try:
+                self.update(await self.probe())
+            except Exception as e:
+                logger.error('PRESSURE-PROBE: {}', e)
+                self.backoff()
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _reserve(self):
+        """按当前速率预留时间槽, 返回需等待的秒数"""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1 / self.rate
+        return slot - now
+
+    def update(self, sample):
+        """根据压力指标调整速率"""
+        rate = self.rate
+        if (sample['status'] == 'red' or sample['pending'] >= self.pending_high
+                or sample['wait_ms'] >= self.wait_high_ms):
+            rate = max(self.min_rate, rate / 2)
+        elif sample['pending'] <= self.pending_low:
+            rate = min(self.max_rate, max(rate + self.step, rate * 1.5))
+        if rate != self.rate:
+            logger.info('PRESSURE: pending: {}, wait: {}ms, status: {}, rate: {:.2f}/s -> {:.2f}/s',
+                        sample['pending'], sample['wait_ms'], sample['status'], self.rate, rate)
+            self.rate = rate
+
+    def backoff(self):
+        """请求超时或被限流时立即减速"""
+        self.rate = max(self.min_rate, self.rate / 2)
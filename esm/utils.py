@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+    utils.py
+    ~~~~~~~~
+    公共函数
+
+    :author: Fufu, 2026/10/18
+"""
+
+
+def batch_indexs(indexs, max_len=3000, max_count=0):
+    """按 URL 长度(及数量)限制把索引名拼接成逗号分隔的批次"""
+    batch, size = [], 0
+    for index in indexs:
+        if batch and (size + len(index) > max_len or 0 < max_count <= len(batch)):
+            yield ','.join(batch)
+            batch, size = [], 0
+        batch.append(index)
+        size += len(index) + 1
+    if batch:
+        yield ','.join(batch)
@@ -15,31 +15,101 @@
     :update: Fufu, 2022/04/29 增加提前新建后天的索引
     :update: Fufu, 2022/06/02 新增索引时不使用 settings, 由模板决定
     :update: Fufu, 2022/07/25 支持 ES 账号密码认证
+    :update: Fufu, 2026/10/18 并发新建索引, 以集群状态轮询代替固定等待
+    :update: Fufu, 2026/10/18 批量查询索引创建时间, 本轮运行内缓存
+    :update: Fufu, 2026/10/18 一次列出所有日期索引, 并发批量删除所有过期索引
+    :update: Fufu, 2026/10/18 新建/删除索引统一基于一次 _cat/indices 生成的索引快照
+    :update: Fufu, 2026/10/18 增加 --async 异步模式, 可同时维护多个集群
+    :update: Fufu, 2026/10/18 新建/删除失败按错误类型指数退避重试, 不阻塞其他索引
+    :update: Fufu, 2026/10/18 建索引速率随 Master 压力自适应调整
+    :update: Fufu, 2026/10/18 索引配置改存 sqlite, 按内容哈希只写入变化的条目, 按需加载
+    :update: Fufu, 2026/10/18 可选按配置分组生成可组合索引模板, 新建索引时不再携带配置
+    :update: Fufu, 2026/10/18 与 reindex 共用进程级 ES 客户端连接池
+    :update: Fufu, 2026/10/18 统计各阶段耗时和 ES 接口调用, 运行结束时写入 JSON 报告(log/run.json)
+    :update: Fufu, 2026/10/18 索引配置一轮只请求一次配置中心, 带超时和条件请求, 内容变化时才写文件
+    :update: Fufu, 2026/10/18 增加 --daemon 常驻模式, 提前新建的索引分摊到全天, 低峰时段删除过期索引
 """
-import json
+import argparse
+import asyncio
 import os
+import shutil
 import sys
 import time
 from datetime import datetime, timedelta
-from hashlib import md5
 
-import requests as requests
-from elasticsearch import Elasticsearch
 from envcrypto import get_environ
 from loguru import logger
 
+from esm.conf import RetentionConf
+from esm.mapping import MappingStore
+from esm.plan import (check_create, check_created, check_delete, delete_batches, new_index_confs, new_index_tasks,
+                      split_batches)
+from esm.retry import RetryScheduler, already_exists, classify
+from esm.scheduler import DailySchedule, parse_hours
+from esm.snapshot import CREATION_DATE_PATH, IndexSnapshot
+from esm.stats import RunStats
+from esm.template import sync_templates
+from esm.throttle import PressureController, health_sample
+from esm.utils import batch_indexs
+from reindex.libs.elasticsearch_reindex.pool import get_client, pool_kwargs
+
 ROOT_DIR = os.path.dirname(os.path.realpath(sys.argv[0]))
+# 索引配置库, 每个集群一个: all_indices_mapping_<集群>.db, 旧版共用的库作为各集群的初始配置
+MAPPING_DB = os.path.join(ROOT_DIR, 'etc', 'all_indices_mapping.db')
+# 旧版索引配置文件, 首次运行时导入
 MAPPING_FILE = os.path.join(ROOT_DIR, 'etc', 'all_indices_mapping.json')
 INDEX_YMD_FORMAT = '_%y%m%d'
-# 创建/删除索引重试次数
-MAX_RETRIES = 5
 # 默认删除 7 天前的索引
 DEFAULT_DAYS = 7
+# 配置中心请求超时(连接, 读取), 配置缓存时间(秒)
+CONF_TIMEOUT = (3, 10)
+CONF_TTL = 600
 # 未指定天数时, 0 表示 190 天
 DEFAULT_DAYS_0 = 190
+# 提前新建未来几天的索引, 1 为只建明天的索引
+LOOKAHEAD_DAYS = 1
+# 常驻模式: 每轮间隔(秒), 提前新建的天数, 索引最迟在当天零点前多少秒建好, 删除过期索引的时段(小时, 2-5 为 2:00-5:00)
+DAEMON_INTERVAL = 600
+DAEMON_LOOKAHEAD_DAYS = 2
+DAEMON_CREATE_MARGIN = 3600
+DAEMON_DELETE_HOURS = '2-5'
+# 常驻模式下索引快照的刷新间隔(秒), 期间由新建/删除结果增量更新
+SNAPSHOT_TTL = 3600
+# 并发新建索引的线程数
+CREATE_WORKERS = int(os.getenv('ESM_CREATE_WORKERS', 8))
+# 每秒最多新建索引数, 实际速率随 Master 压力自适应
+CREATE_MAX_RATE = float(os.getenv('ESM_CREATE_MAX_RATE', 20))
+# 等待集群任务/索引分片就绪的超时时间(秒)
+WAIT_TIMEOUT = 300
+# 批量请求时拼接到 URL 中的索引名最大总长度
+BATCH_URL_LEN = 3000
+# 每批删除的最大索引数
+DELETE_BATCH_SIZE = 50
+# 并发删除索引的线程数
+DELETE_WORKERS = int(os.getenv('ESM_DELETE_WORKERS', 4))
+# 每个 ES 节点保持的最大连接数, 请求体压缩, 节点嗅探
+ES_MAXSIZE = max(10, CREATE_WORKERS, DELETE_WORKERS)
+ES_HTTP_COMPRESS = True
+ES_SNIFF = False
+# 相同配置的索引共用可组合索引模板(--templates), 模板优先级
+USE_TEMPLATES = False
+TEMPLATE_PRIORITY = 200
 # ES 账号密码认证
 ES_HTTP_AUTH = None
 ES = None
+# 本轮运行的索引快照
+SNAPSHOT = None
+# 本轮运行的建索引速率控制器
+PRESSURE = None
+# 当前集群的索引配置存储, 常驻模式下每个集群一直使用同一个
+MAPPING = None
+# 当前维护的集群名称
+CLUSTER = 'dev'
+# 运行统计, 结束时写入 JSON 报告, 与 run.log 同目录
+STATS = RunStats()
+STATS_FILE = os.path.join(ROOT_DIR, 'log', 'run.json')
+# 索引保留天数配置
+INDEX_CONF = None
 
 
 def init_logger():
@@ -63,8 +133,10 @@ def init_logger():
 
 
 def init_es(hosts):
-    """连接 ES"""
-    client = Elasticsearch(hosts, max_retries=3, timeout=30, retry_on_timeout=False)
+    """连接 ES, 重试 3 次仍失败时抛出 ConnectionError"""
+    client = get_client(hosts, http_auth=ES_HTTP_AUTH, maxsize=ES_MAXSIZE, http_compress=ES_HTTP_COMPRESS,
+                        sniff=ES_SNIFF)
+    STATS.instrument(client)
     for i in range(3):
         try:
             client.info(http_auth=ES_HTTP_AUTH)
@@ -72,193 +144,380 @@ def init_es(hosts):
         except Exception as e:
             logger.error('INIT: ({}) {}', i, e)
 
-    exit(1)
+    raise ConnectionError('cannot connect to es: {}'.format(hosts))
 
 
-def create_new_indexs():
-    """新建索引"""
-    mapping = load_mapping()
-    indices = {}
-    today = datetime.now()
-    yesterday = today + timedelta(days=-1)
-    tomorrow = today + timedelta(days=1)
-    # after_tomorrow = today + timedelta(days=2)
+@STATS.timed()
+def create_new_indexs(days=None, quota=None, confs=None):
+    """新建索引
 
-    # 昨天, 明天, 后天, 索引日志后缀
-    suffix_a = yesterday.strftime(INDEX_YMD_FORMAT)
-    suffix_b = tomorrow.strftime(INDEX_YMD_FORMAT)
-    # suffix_c = after_tomorrow.strftime(INDEX_YMD_FORMAT)
+    :param days: 提前新建未来几天的索引, 默认 LOOKAHEAD_DAYS
+    :param quota: quota(日期, 待建数) 返回本次最多新建的索引数, 为 None 时全部新建
+    :param confs: 索引配置, 为 None 时从昨天的索引获取
+    """
+    if confs is None:
+        confs = get_new_index_confs()
+
+    # 建未来的索引
+    tasks = new_index_tasks(get_snapshot(), confs, datetime.now(), days or LOOKAHEAD_DAYS, quota=quota)
+
+    # 并发建索引, 单个索引出错时按错误类型退避重试(见 esm.retry), 4xx 不重试
+    failed = create_indexs(tasks)
+    if failed:
+        logger.error('NEW-FAILED: {}', [cfg[0] for cfg in failed])
 
-    retries_indexs = []
 
-    pos = len(suffix_a)
-    # 取昨天的索引配置
+@STATS.timed()
+def get_new_index_confs():
+    """获取新建索引的配置: 昨天的索引配置, 补齐配置文件中的索引"""
+    mapping = get_mapping()
+    yesterday = datetime.now() + timedelta(days=-1)
+
+    # 昨天的索引日志后缀
+    suffix_a = yesterday.strftime(INDEX_YMD_FORMAT)
+
+    # 取昨天的索引配置, 补漏可能存在于待删除列表的索引, 使用模板时保留 settings
     index_yesterday = '*' + suffix_a
-    for index, conf in ES.indices.get(index=index_yesterday, http_auth=ES_HTTP_AUTH).items():
-        index_title = index[:-pos]
-        # 移除 settings 配置项
-        conf.pop("settings", None)
-        # 保存最新索引配置项
-        mapping[index_title] = conf
-        indices[index_title] = True
-        # 建未来的索引
-        for x in [suffix_b]:
-            index_x = index_title + x
-            if not create_index(index_x, conf):
-                retries_indexs.append([index_x, conf])
-
-    # 补漏, 可能存在于待删除列表
-    for index_title in get_index_conf():
-        if index_title in indices:
-            continue
-        conf = mapping.get(index_title, {})
-        # 建未来的索引
-        for x in [suffix_b]:
-            index_x = index_title + x
-            if not create_index(index_x, conf):
-                retries_indexs.append([index_x, conf])
+    indexs = ES.indices.get(index=index_yesterday, http_auth=ES_HTTP_AUTH)
+    confs = new_index_confs(indexs, get_snapshot(), mapping, get_index_conf(), keep_settings=USE_TEMPLATES)
 
     # 保存最新的 MAPPING
     save_mapping(mapping)
 
-    # 重试创建已失败的索引
-    retry_create_index(retries_indexs)
+    # 相同配置的索引共用模板, 新建时不再携带配置
+    if USE_TEMPLATES:
+        confs = apply_templates(confs)
+
+    return confs
+
+
+@STATS.timed()
+def apply_templates(confs):
+    """按配置分组新建/更新可组合索引模板, 已由模板覆盖的索引配置置空"""
+    return sync_templates(ES, confs, get_snapshot().families, INDEX_YMD_FORMAT, TEMPLATE_PRIORITY,
+                          http_auth=ES_HTTP_AUTH)
+
+
+@STATS.timed()
+def create_indexs(tasks, workers=None):
+    """并发新建索引, 返回创建失败的索引列表"""
+    if not tasks:
+        return []
+
+    workers = min(workers or CREATE_WORKERS, len(tasks))
+    logger.info('NEW-INDEXS: {}, WORKERS: {}', len(tasks), workers)
+    # 速率控制器在启动工作线程前创建, 各线程共用同一个
+    get_pressure()
+    scheduler = RetryScheduler(workers, tag='NEW-RETRY')
+    for index_b, conf in tasks:
+        scheduler.add(index_b, create_index, index_b, conf)
+    scheduler.run()
+
+    # 批量校验创建结果
+    load_index_dates([cfg[0] for cfg in tasks])
+    return check_created(get_snapshot(), tasks)
+
 
+def get_mapping():
+    """获取当前集群的索引配置存储, 首次调用时打开"""
+    global MAPPING
+    if MAPPING is None:
+        MAPPING = load_mapping(CLUSTER)
 
-def load_mapping():
-    """加载保存的索引配置"""
+    return MAPPING
+
+
+@STATS.timed()
+def load_mapping(cluster):
+    """加载集群保存的索引配置, 各集群的配置分开保存, 配置内容按需读取"""
+    root, ext = os.path.splitext(MAPPING_DB)
+    path = '{}_{}{}'.format(root, cluster, ext)
     try:
-        with open(MAPPING_FILE, 'r') as f:
-            res = json.load(f)
-            return res
+        if not os.path.exists(path) and os.path.isfile(MAPPING_DB):
+            shutil.copyfile(MAPPING_DB, path)
+        return MappingStore(path, legacy_file=MAPPING_FILE)
     except Exception as e:
+        # 本轮使用内存库, 不影响建索引
         logger.error('LOAD-MAPPING: {}', e)
-        return {}
+        return MappingStore(':memory:')
 
 
-def save_mapping(mapping=None):
-    """保存索引配置"""
+@STATS.timed()
+def save_mapping(mapping):
+    """保存索引配置, 只写入有变化的条目"""
     try:
-        with open(MAPPING_FILE, 'w') as f:
-            json.dump(mapping, f, ensure_ascii=False, indent=2)
+        logger.info('SAVE-MAPPING: {}/{}, UNIQUE: {}', mapping.flush(), len(mapping), len(mapping.groups()))
     except Exception as e:
         logger.error('SAVE-MAPPING: {}', e)
 
 
+@STATS.timed(keyed=True)
 def create_index(index_b, conf):
-    """建明天的索引"""
+    """建明天的索引, 创建结果由 create_indexs 批量校验, 请求出错时抛出异常由调度器重试"""
     logger.info('NEW-START: {}', index_b)
-    time.sleep(1)
 
     # 先查询索引是否已存在
     if check_index(index_b):
         logger.info('EXISTS: {}', index_b)
         return True
 
+    # 按 Master 压力限速, 避免集中建索引压垮 Master
+    pressure = get_pressure()
+    with STATS.span('pressure_wait'):
+        pressure.acquire()
+
     try:
-        res = ES.indices.create(index=index_b, timeout='300s', ignore=400, http_auth=ES_HTTP_AUTH, **conf)
-        logger.info('NEW-RESULT: {}, OK: {}, [{}] {}', index_b,
-                    res.get('acknowledged'), res.get('status'), res.get('error', {}).get('reason', ''))
+        res = ES.indices.create(index=index_b, timeout='{}s'.format(WAIT_TIMEOUT), wait_for_active_shards=1,
+                                request_timeout=WAIT_TIMEOUT + 10, http_auth=ES_HTTP_AUTH, body=conf)
     except Exception as e:
-        logger.error('NEW-ERROR: {} {}', index_b, e)
-        time.sleep(60)
-        return False
+        if already_exists(e):
+            logger.info('EXISTS: {}', index_b)
+            return True
+        if classify(e) in ('timeout', 'throttle'):
+            pressure.backoff()
+            STATS.incr('pressure_backoff')
+        raise
 
-    time.sleep(60)
+    # 主分片在超时前就绪时 shards_acknowledged 为 True, 无需再查询集群健康状态
+    return check_create(res, index_b)
 
-    creation_date = check_index(index_b)
-    if creation_date:
-        logger.info('NEW-END: {} {}', index_b, datetime.fromtimestamp(int(creation_date) / 1000).isoformat())
-        time.sleep(1)
-        return True
 
-    time.sleep(30)
-    logger.info('NEW-CHECK: {} NONE', index_b)
-    return False
+def get_pressure():
+    """获取本轮运行的建索引速率控制器, 首次调用须在建索引的工作线程启动前(见 create_indexs)"""
+    global PRESSURE
+    if PRESSURE is None:
+        PRESSURE = PressureController(probe_cluster, max_rate=CREATE_MAX_RATE)
 
+    return PRESSURE
 
-def retry_create_index(retries_indexs):
-    """重试创建索引"""
-    logger.info("RETRY-INDEXS: {}", retries_indexs)
-    for cfg in retries_indexs:
-        for m in range(MAX_RETRIES):
-            logger.info("RETRY-CREATE({}): {}", m, cfg)
-            if create_index(*cfg):
-                break
+
+def probe_cluster():
+    """采样集群压力: Master 待处理任务数, 最长排队时间, 健康状态"""
+    return health_sample(ES.cluster.health(http_auth=ES_HTTP_AUTH))
+
+
+def get_snapshot():
+    """获取本轮运行的索引快照, 首次调用时一次性拉取"""
+    global SNAPSHOT
+    if SNAPSHOT is None:
+        try:
+            with STATS.span('snapshot'):
+                SNAPSHOT = IndexSnapshot.from_es(ES, http_auth=ES_HTTP_AUTH, ymd_format=INDEX_YMD_FORMAT)
+            logger.info('SNAPSHOT: INDEXS: {}, FAMILIES: {}', len(SNAPSHOT), len(SNAPSHOT.families))
+        except Exception as e:
+            # 快照失败时所有索引按不存在处理, 新建结果仍由 load_index_dates 校验
+            logger.error('SNAPSHOT: {}', e)
+            SNAPSHOT = IndexSnapshot(ymd_format=INDEX_YMD_FORMAT)
+
+    return SNAPSHOT
 
 
 def check_index(index):
-    """获取索引创建时间"""
-    try:
-        creation_date = ES.indices.get(index=index, http_auth=ES_HTTP_AUTH).get(index, {}). \
-            get('settings', {}).get('index', {}).get('creation_date')
-        return creation_date if creation_date else 0
-    except Exception:
-        return 0
+    """获取索引创建时间, 以本轮快照为准"""
+    return get_snapshot().creation_date(index)
 
 
-def get_index_conf():
-    """获取索引配置文件"""
-    # 获取数据源待删除索引配置
-    group_name = 'es-delete-old-index'
-    conf_file = os.path.join(ROOT_DIR, 'etc', '{}.conf'.format(group_name))
-    api_key = get_environ('ESM_XY_MONITOR_API_KEY', group_name)
-    if api_key:
-        # 获取远程配置
-        api_url = 'http://demo.conf-center.com/api' \
-                  'name={}&demo_token={}'.format(group_name, api_key)
+@STATS.timed()
+def load_index_dates(indexs):
+    """批量获取索引创建时间, 结果写入本轮快照"""
+    snapshot = get_snapshot()
+    for names in batch_indexs(indexs, max_len=BATCH_URL_LEN):
         try:
-            resp = requests.get(api_url).json()
-            if resp['ok'] == 1:
-                # 最新配置
-                with open(conf_file, 'w+', encoding='utf-8', newline='\n') as f:
-                    f.write(resp['data'][0]['ip_info'])
+            res = ES.indices.get(index=names, ignore_unavailable=True, allow_no_indices=True,
+                                 filter_path=CREATION_DATE_PATH, http_auth=ES_HTTP_AUTH)
         except Exception as e:
-            logger.error('CONF: {} {}', group_name, e)
+            logger.error('CHECK-INDEX: {}', e)
+            continue
+        snapshot.add_creation_dates(res)
+
+
+@STATS.timed()
+def get_index_conf():
+    """获取索引配置(保留天数), 缓存 CONF_TTL 秒, 配置中心不可用时使用上次的配置文件"""
+    global INDEX_CONF
+    if INDEX_CONF is None:
+        # 获取数据源待删除索引配置
+        group_name = 'es-delete-old-index'
+        conf_file = os.path.join(ROOT_DIR, 'etc', '{}.conf'.format(group_name))
+        api_key = get_environ('ESM_XY_MONITOR_API_KEY', group_name)
+        api_url = None
+        if api_key:
+            api_url = 'http://demo.conf-center.com/api' \
+                      'name={}&demo_token={}'.format(group_name, api_key)
+        INDEX_CONF = RetentionConf(conf_file, url=api_url, timeout=CONF_TIMEOUT, ttl=CONF_TTL,
+                                   default_days=DEFAULT_DAYS, stats=STATS)
+
+    return INDEX_CONF.get()
+
+
+@STATS.timed()
+def delete_old_indexs():
+    """按配置删除所有过期的旧索引"""
+    indexs = get_index_conf()
+    if not indexs:
+        return
+
+    batches = delete_batches(get_snapshot(), indexs, datetime.now().date(), DEFAULT_DAYS_0, BATCH_URL_LEN,
+                             DELETE_BATCH_SIZE)
+    if not batches:
+        return
+
+    failed = delete_indexs(batches)
+    if failed:
+        logger.error('DELETE-FAILED: {}', failed)
+
+
+def delete_indexs(batches, split=True):
+    """并发批量删除索引, 失败的批次按错误类型退避重试, 返回最终失败的批次
+
+    批次中任一索引出错(如正在快照)时整批失败, 拆开逐个删除, 只有真正失败的索引计入结果
+    """
+    scheduler = RetryScheduler(min(DELETE_WORKERS, len(batches)), tag='DELETE-RETRY')
+    for names in batches:
+        scheduler.add(names, delete_index, names)
+    results, failed = scheduler.run()
+    for names in results:
+        for index in names.split(','):
+            get_snapshot().discard(index)
+
+    if not split:
+        return list(failed)
+
+    failed, singles = split_batches(failed)
+    return failed + delete_indexs(singles, split=False) if singles else failed
+
+
+@STATS.timed(keyed=True)
+def delete_index(names):
+    """删除一批索引(逗号分隔), 出错或未确认时抛出异常/返回 False"""
+    res = ES.indices.delete(index=names, timeout='{}s'.format(WAIT_TIMEOUT), ignore=404, ignore_unavailable=True,
+                            request_timeout=WAIT_TIMEOUT + 10, http_auth=ES_HTTP_AUTH)
+    return check_delete(res, names)
+
+
+def run(name, hosts):
+    """同步维护单个集群"""
+    global CLUSTER, ES, SNAPSHOT, PRESSURE, MAPPING
+
+    logger.info('init es client')
+    CLUSTER = name
+    ES = init_es(hosts)
+    SNAPSHOT = None
+    PRESSURE = None
+    MAPPING = None
 
-    # 加载索引配置文件
     try:
-        with open(conf_file, 'r', encoding='utf-8') as f:
-            res = {}
-            for conf in f.readlines():
-                conf = conf.strip()
-                if not conf or conf.startswith('#'):
-                    continue
-                conf += ' '
-                index, n = conf.split(' ', 1)
+        logger.info('create new indexs')
+        create_new_indexs()
+
+        logger.info('delete old indexs')
+        delete_old_indexs()
+    finally:
+        if MAPPING is not None:
+            MAPPING.close()
+
+
+class DaemonCluster:
+    """常驻模式下单个集群的状态: 连接, 索引快照, 限速器, 当天的索引配置, 调度"""
+
+    def __init__(self, name, hosts, schedule):
+        self.name = name
+        self.hosts = hosts
+        self.schedule = schedule
+        self.es = None
+        self.snapshot = None
+        self.snapshot_at = 0
+        self.pressure = None
+        self.mapping = None
+        self.confs_date = None
+        self.confs = None
+
+    def tick(self):
+        """执行一轮: 切换到本集群的全局状态, 按配额新建索引, 低峰时段删除过期索引"""
+        global CLUSTER, ES, SNAPSHOT, PRESSURE, MAPPING
+
+        # 连接失败时抛出异常, 本轮跳过该集群, 下一轮重新连接
+        if self.es is None:
+            self.es = init_es(self.hosts)
+        if time.monotonic() - self.snapshot_at >= SNAPSHOT_TTL:
+            self.snapshot = None
+            self.snapshot_at = time.monotonic()
+        CLUSTER, ES, SNAPSHOT, PRESSURE, MAPPING = self.name, self.es, self.snapshot, self.pressure, self.mapping
+        try:
+            # 索引配置每天获取一次
+            today = datetime.now().date()
+            if self.confs_date != today:
+                self.confs = get_new_index_confs()
+                self.confs_date = today
+            create_new_indexs(days=self.schedule.lookahead, quota=self.schedule.create_quota, confs=self.confs)
+
+            if self.schedule.should_delete():
+                logger.info('[{}] delete old indexs', self.name)
+                delete_old_indexs()
+                self.schedule.mark_deleted()
+        finally:
+            self.snapshot, self.pressure, self.mapping = SNAPSHOT, PRESSURE, MAPPING
+
+
+def run_daemon(clusters, interval=DAEMON_INTERVAL, lookahead=DAEMON_LOOKAHEAD_DAYS, delete_hours=DAEMON_DELETE_HOURS):
+    """常驻模式: 保持连接和索引快照, 每轮按配额提前新建索引, 低峰时段删除过期索引"""
+    hours = parse_hours(delete_hours)
+    daemons = [
+        DaemonCluster(name, hosts, DailySchedule(interval, lookahead=lookahead, margin=DAEMON_CREATE_MARGIN,
+                                                 delete_hours=hours))
+        for name, hosts in clusters.items()
+    ]
+    logger.info('DAEMON: CLUSTERS: {}, INTERVAL: {}s, LOOKAHEAD: {}, DELETE-HOURS: {}',
+                [d.name for d in daemons], interval, lookahead, sorted(hours))
+    try:
+        while True:
+            started = time.monotonic()
+            for daemon in daemons:
+                logger.info('cluster: {}', daemon.name)
                 try:
-                    n = int(n.strip())
-                except Exception:
-                    n = DEFAULT_DAYS
-                res[index] = n
-            return res
-    except Exception as e:
-        logger.error('CONF: {}', e)
-        return {}
+                    with STATS.span('cluster', daemon.name):
+                        daemon.tick()
+                except Exception as e:
+                    logger.error('[{}] DAEMON: {}', daemon.name, e)
+            STATS.write(STATS_FILE)
+            time.sleep(max(0, interval - (time.monotonic() - started)))
+    finally:
+        for daemon in daemons:
+            if daemon.mapping is not None:
+                daemon.mapping.close()
+
+
+def run_async(clusters):
+    """异步并发维护多个集群, 返回出错的集群名称"""
+    from esm.aio import AsyncMaintainer, run_clusters
+
+    maintainers = [
+        AsyncMaintainer(name, hosts, http_auth=ES_HTTP_AUTH, ymd_format=INDEX_YMD_FORMAT,
+                        create_workers=CREATE_WORKERS, create_max_rate=CREATE_MAX_RATE, delete_workers=DELETE_WORKERS,
+                        wait_timeout=WAIT_TIMEOUT, default_days_0=DEFAULT_DAYS_0,
+                        batch_url_len=BATCH_URL_LEN, delete_batch_size=DELETE_BATCH_SIZE,
+                        template_priority=TEMPLATE_PRIORITY if USE_TEMPLATES else None, stats=STATS,
+                        lookahead=LOOKAHEAD_DAYS,
+                        es_kwargs=pool_kwargs(maxsize=ES_MAXSIZE, http_compress=ES_HTTP_COMPRESS, sniff=ES_SNIFF))
+        for name, hosts in clusters.items()
+    ]
+    mappings = {m.name: load_mapping(m.name) for m in maintainers}
+    failed = asyncio.run(run_clusters(maintainers, get_index_conf(), mappings))
+    for mapping in mappings.values():
+        save_mapping(mapping)
+        mapping.close()
+    return failed
 
 
-def delete_old_indexs():
-    """按配置删除旧索引"""
-    indexs = get_index_conf()
-    for m in range(MAX_RETRIES):
-        n = len(indexs)
-        if n == 0:
-            return
-        logger.info("DELETE-INDEX: {}, COUNT: {}", m + 1, n)
-        for index in list(indexs.keys()):
-            days = indexs[index]
-            if days <= 0:
-                days = DEFAULT_DAYS_0
-
-            old_index = '{}{}'.format(index, (datetime.now() - timedelta(days)).strftime(INDEX_YMD_FORMAT))
-            try:
-                ES.indices.delete(index=old_index, timeout='300s', ignore=[400, 404], http_auth=ES_HTTP_AUTH)
-                indexs.pop(index)
-                logger.info('DELETE-OK: {}', old_index)
-                time.sleep(1)
-            except Exception as e:
-                logger.error('DELETE-ERROR: {} {}', old_index, e)
-                time.sleep(30)
+def positive_int(value):
+    """命令行参数: 正整数"""
+    try:
+        n = int(value)
+    except ValueError:
+        n = 0
+    if n < 1:
+        raise argparse.ArgumentTypeError('must be an integer >= 1: {}'.format(value))
+    return n
 
 
 if __name__ == '__main__':
@@ -268,21 +527,60 @@ if __name__ == '__main__':
         {'host': '192.168.0.12', 'port': 9200},
     ]
     hosts_dev = [{'host': '127.0.0.1', 'port': 9200}]
+    all_hosts = {'main': hosts_main, 'dev': hosts_dev}
+
+    parser = argparse.ArgumentParser(description='ES 管理脚本')
+    parser.add_argument('-c', '--cluster', action='append', choices=sorted(all_hosts),
+                        help='要维护的集群, 可多次指定, 默认: dev')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='异步模式, 多个集群同时维护')
+    parser.add_argument('--templates', action='store_true',
+                        help='相同配置的索引共用可组合索引模板, 注意会覆盖旧版模板(_template)中的 settings')
+    parser.add_argument('--lookahead', type=positive_int,
+                        help='提前新建未来几天的索引, 默认: {}, 常驻模式: {}'.format(LOOKAHEAD_DAYS, DAEMON_LOOKAHEAD_DAYS))
+    parser.add_argument('--daemon', action='store_true',
+                        help='常驻模式, 代替 cron: 提前新建的索引分摊到全天, 低峰时段删除过期索引')
+    parser.add_argument('--interval', type=int, default=DAEMON_INTERVAL,
+                        help='常驻模式每轮间隔(秒), 默认: {}'.format(DAEMON_INTERVAL))
+    parser.add_argument('--delete-hours', default=DAEMON_DELETE_HOURS,
+                        help='常驻模式删除过期索引的时段(小时, 不含结束小时), 如: 2-5,23, 默认: {}'.format(DAEMON_DELETE_HOURS))
+    args = parser.parse_args()
+    if args.daemon and args.use_async:
+        parser.error('--daemon 不支持 --async')
+    try:
+        parse_hours(args.delete_hours)
+    except ValueError as e:
+        parser.error(str(e))
+    USE_TEMPLATES = args.templates
+    if args.lookahead:
+        LOOKAHEAD_DAYS = DAEMON_LOOKAHEAD_DAYS = args.lookahead
 
     init_logger()
 
-    logger.info('init es client')
-
     es_http_auth = get_environ('ESM_HTTP_AUTH', 'ESM_HTTP_AUTH')
     ES_HTTP_AUTH = tuple(es_http_auth.split(':', 1)) if es_http_auth else None
 
-    # ES = init_es(hosts_kibana)
-    ES = init_es(hosts_dev)
-
-    logger.info('create new indexs')
-    create_new_indexs()
-
-    logger.info('delete old indexs')
-    delete_old_indexs()
+    clusters = {name: all_hosts[name] for name in args.cluster or ['dev']}
+    try:
+        if args.daemon:
+            run_daemon(clusters, interval=args.interval, lookahead=DAEMON_LOOKAHEAD_DAYS,
+                       delete_hours=args.delete_hours)
+        elif args.use_async:
+            if run_async(clusters):
+                exit(1)
+        else:
+            failed = []
+            for name, hosts in clusters.items():
+                logger.info('cluster: {}', name)
+                try:
+                    with STATS.span('cluster', name):
+                        run(name, hosts)
+                except ConnectionError as e:
+                    logger.error('[{}] {}', name, e)
+                    failed.append(name)
+            if failed:
+                exit(1)
+    finally:
+        STATS.write(STATS_FILE)
 
     logger.info('done')
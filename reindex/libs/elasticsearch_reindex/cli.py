@@ -1,9 +1,11 @@
-from typing import List
+from typing import Any, Callable, List
 
 import click
 from click_default_group import DefaultGroup
 
+from .const import DEFAULT_MODE, DEFAULT_SYNC_INTERVAL, MODE_REMOTE, MODE_STREAM
 from .manager import Manager
+from .pool import close_clients
 
 
 @click.group(cls=DefaultGroup, default="reindex", default_if_no_args=True)
@@ -13,68 +15,251 @@ def cli() -> None:
     """
 
 
+_OPTIONS = [
+    click.option(
+        "--source_host",
+        required=True,
+        type=str,
+        help="Source server: Elasticsearch host where data will be transferred from",
+    ),
+    click.option(
+        "--dest_host",
+        required=True,
+        type=str,
+        help="Destination server: Elasticsearch host where data will be transferred",
+    ),
+    click.option(
+        "--source_http_auth",
+        required=False,
+        type=str,
+        help="Source server: HTTP Basic authentication, username and password",
+    ),
+    click.option(
+        "--dest_http_auth",
+        required=False,
+        type=str,
+        help="Destination server: HTTP Basic authentication, username and password",
+    ),
+    click.option(
+        "--check_interval",
+        required=False,
+        type=int,
+        help="Interval for check Elasticsearch reindex task (in seconds)",
+    ),
+    click.option(
+        "--concurrent_tasks",
+        required=False,
+        type=int,
+        help="Number of max concurrent reindex tasks",
+    ),
+    click.option(
+        "--maxsize",
+        required=False,
+        type=int,
+        help="Max kept-alive connections per Elasticsearch node in the shared client pool",
+    ),
+    click.option(
+        "--http_compress/--no-http_compress",
+        default=True,
+        help="Gzip request bodies sent to Elasticsearch",
+    ),
+    click.option(
+        "--sniff",
+        is_flag=True,
+        default=False,
+        help="Discover cluster nodes on start and on connection failure",
+    ),
+    click.option(
+        "--slices",
+        required=False,
+        type=int,
+        help="Split large indexes into this number of concurrent reindex sub-tasks",
+    ),
+    click.option(
+        "--slice_field",
+        required=False,
+        type=str,
+        help="Numeric or date field to split large indexes by range (e.g. @timestamp), _id hash by default",
+    ),
+    click.option(
+        "--slice_min_size",
+        required=False,
+        type=int,
+        help="Only slice indexes with store size above this value (in bytes)",
+    ),
+    click.option(
+        "--batch_size",
+        required=False,
+        type=int,
+        help="Scroll batch size of reindex from remote (documents)",
+    ),
+    click.option(
+        "--requests_per_second",
+        required=False,
+        type=float,
+        help="Initial throttle of every reindex task (documents per second), unlimited by default",
+    ),
+    click.option(
+        "--socket_timeout",
+        required=False,
+        type=str,
+        help="Socket read timeout of reindex from remote (e.g. 1m)",
+    ),
+    click.option(
+        "--connect_timeout",
+        required=False,
+        type=str,
+        help="Connect timeout of reindex from remote (e.g. 30s)",
+    ),
+    click.option(
+        "--target_docs_per_sec",
+        required=False,
+        type=float,
+        help="Limit total rate of running tasks (documents per second) by live rethrottling",
+    ),
+    click.option(
+        "--peak_hours",
+        required=False,
+        type=str,
+        help="Hours when target_docs_per_sec is enforced (e.g. 8-20), unlimited outside",
+    ),
+    click.option(
+        "--adaptive_throttle",
+        is_flag=True,
+        default=False,
+        help="Rethrottle running tasks when destination write thread pools queue or reject",
+    ),
+    click.option(
+        "--journal",
+        required=False,
+        type=click.Path(dir_okay=False),
+        help="Checkpoint journal (sqlite) file, a rerun reattaches to running tasks and resumes what remains",
+    ),
+    click.option(
+        "--delta",
+        is_flag=True,
+        default=False,
+        help="Copy only missing documents of partial migrated indexes (op_type create)",
+    ),
+    click.option(
+        "--delta_field",
+        required=False,
+        type=str,
+        help="Numeric or date field to copy only documents newer than dest max value, slice_field by default",
+    ),
+    click.option(
+        "--mode",
+        type=click.Choice([MODE_REMOTE, MODE_STREAM]),
+        default=DEFAULT_MODE,
+        help="remote: reindex from remote on dest cluster, stream: scroll and bulk through this process",
+    ),
+    click.option(
+        "--stream_readers",
+        required=False,
+        type=int,
+        help="Stream mode: sliced scroll readers per index",
+    ),
+    click.option(
+        "--stream_queue_size",
+        required=False,
+        type=int,
+        help="Stream mode: max documents buffered between readers and bulk writers",
+    ),
+    click.option(
+        "--bulk_threads",
+        required=False,
+        type=int,
+        help="Stream mode: bulk writer threads per index",
+    ),
+    click.option(
+        "--max_chunk_bytes",
+        required=False,
+        type=int,
+        help="Stream mode: max bulk request size (in bytes)",
+    ),
+    click.option(
+        "--metrics_file",
+        required=False,
+        type=click.Path(dir_okay=False),
+        help="Write Prometheus metrics (docs/sec, bytes/sec, ETA, throttle time) to this textfile",
+    ),
+    click.option(
+        "--metrics_port",
+        required=False,
+        type=int,
+        help="Serve Prometheus metrics on http://127.0.0.1:<port>/metrics",
+    ),
+    click.option(
+        "--indexes",
+        "-i",
+        required=False,
+        multiple=True,
+        help="List of specific Elasticsearch indexes to migrate",
+    ),
+]
+
+
+def reindex_options(func: Callable) -> Callable:
+    """
+    Apply connection and reindex options shared by commands.
+    """
+    for option in reversed(_OPTIONS):
+        func = option(func)
+    return func
+
+
+def _get_config(indexes: List[str], **options: Any) -> dict:
+    return {**options, "indexes": list(indexes)}
+
+
 @cli.command()
+@reindex_options
+def reindex(**options: Any) -> None:
+    """
+    Copy not migrated indexes (and partial migrated with --delta).
+    """
+    reindex_manager = Manager.from_dict(data=_get_config(**options))
+    try:
+        reindex_manager.start_reindex()
+    finally:
+        close_clients()
+    click.echo("Success")
+
+
+@cli.command()
+@reindex_options
 @click.option(
-    "--source_host",
-    required=True,
-    type=str,
-    help="Source server: Elasticsearch host where data will be transferred from",
-)
-@click.option(
-    "--dest_host",
-    required=True,
-    type=str,
-    help="Destination server: Elasticsearch host where data will be transferred",
-)
-@click.option(
-    "--source_http_auth",
-    required=False,
-    type=str,
-    help="Source server: HTTP Basic authentication, username and password",
-)
-@click.option(
-    "--dest_http_auth",
+    "--sync_field",
     required=False,
     type=str,
-    help="Destination server: HTTP Basic authentication, username and password",
+    help="Update timestamp or sequence field for incremental passes, delta_field by default",
 )
 @click.option(
-    "--check_interval",
+    "--sync_interval",
     required=False,
     type=int,
-    help="Interval for check Elasticsearch reindex task (in seconds)",
+    default=DEFAULT_SYNC_INTERVAL,
+    help="Pause between incremental passes (in seconds)",
 )
 @click.option(
-    "--concurrent_tasks",
-    required=False,
-    type=int,
-    help="Number of max concurrent reindex tasks",
+    "--until_converged",
+    is_flag=True,
+    default=False,
+    help="Stop after a pass finds source and destination in sync",
 )
 @click.option(
-    "--indexes",
-    "-i",
+    "--max_passes",
     required=False,
-    multiple=True,
-    help="List of specific Elasticsearch indexes to migrate",
+    type=int,
+    help="Stop after this number of incremental passes",
 )
-def reindex(
-    source_host: str,
-    dest_host: str,
-    source_http_auth: str,
-    dest_http_auth: str,
-    check_interval: int,
-    concurrent_tasks: int,
-    indexes: List[str],
-) -> None:
-    config = {
-        "source_host": source_host,
-        "dest_host": dest_host,
-        "source_http_auth": source_http_auth,
-        "dest_http_auth": dest_http_auth,
-        "check_interval": check_interval,
-        "concurrent_tasks": concurrent_tasks,
-        "indexes": list(indexes),
-    }
-    reindex_manager = Manager.from_dict(data=config)
-    reindex_manager.start_reindex()
+def sync(**options: Any) -> None:
+    """
+    Copy indexes, then keep copying changed documents until writers are switched.
+    """
+    reindex_manager = Manager.from_dict(data=_get_config(**options))
+    try:
+        reindex_manager.start_sync()
+    finally:
+        close_clients()
     click.echo("Success")
@@ -2,11 +2,11 @@ from typing import List, Optional, Tuple
 
 from elasticsearch import Elasticsearch, exceptions
 
-from .const import DEFAULT_ES_KWARGS
 from .errors import (
     ES_NODE_NOT_FOUND_ERROR,
     ElasticSearchNodeNotFoundException,
 )
+from .pool import get_client
 from .schema import Config, Index
 from .utils import chunkify
 
@@ -39,7 +39,7 @@ class ElasticsearchClient:
         Return all indexes in Elasticsearch and amount of documents.
         """
         indexes = self.source_client.cat.indices(
-            h="index,docs.count", s="index",
+            h="index,docs.count,store.size", s="index", bytes="b",
             index=self.indexes, http_auth=self.config.source_http_auth,
         )
         return self._get_all_indexes(indexes=indexes.split())
@@ -49,19 +49,24 @@ class ElasticsearchClient:
         Return all indexes in Elasticsearch and amount of documents.
         """
         indexes = self.dest_client.cat.indices(
-            h="index,docs.count", s="index",
+            h="index,docs.count,store.size", s="index", bytes="b",
             http_auth=self.config.dest_http_auth,
         )
         return self._get_all_indexes(indexes=indexes.split())
 
-    @staticmethod
-    def _get_es_client(es_host: str, es_http_auth: Optional[Tuple[str]] = None) -> Elasticsearch:
+    def _get_es_client(self, es_host: str, es_http_auth: Optional[Tuple[str]] = None) -> Elasticsearch:
         """
-        Ping ElasticSearch server and return initialized client object.
+        Return shared client from the process-wide pool, ping ElasticSearch server on first use.
         """
-        client = Elasticsearch(hosts=es_host, **DEFAULT_ES_KWARGS)  # type: ignore
         try:
-            client.info(http_auth=es_http_auth)
+            return get_client(
+                hosts=es_host,
+                http_auth=es_http_auth,
+                ping=True,
+                maxsize=self.config.maxsize,
+                http_compress=self.config.http_compress,
+                sniff=self.config.sniff,
+            )
         except exceptions.ConnectionError:
             raise ElasticSearchNodeNotFoundException(
                 message=ES_NODE_NOT_FOUND_ERROR.format(host=es_host)
@@ -70,15 +75,14 @@ class ElasticsearchClient:
             raise ElasticSearchNodeNotFoundException(
                 message=ES_NODE_NOT_FOUND_ERROR.format(host='{}, error: {}'.format(es_host, e))
             )
-        return client
 
     @staticmethod
     def _get_all_indexes(indexes: List[str]) -> List[Index]:
         """
-        Return all indexes in Elasticsearch and amount of documents.
+        Return all indexes in Elasticsearch, amount of documents and store size in bytes.
         """
         return [
-            Index(name=name, docs_count=int(count))
-            for name, count in chunkify(lst=indexes, n=2)
+            Index(name=name, docs_count=int(count), store_size=int(size))
+            for name, count, size in chunkify(lst=indexes, n=3)
             if not name.startswith(".")
         ]
@@ -1,15 +1,50 @@
-# Default Headers for call ElasticSearch API.
-HEADERS = {"Content-Type": "application/json"}
-
 # Default arguments for ElasticSearch client init.
 DEFAULT_ES_KWARGS = {"max_retries": 3, "timeout": 30, "retry_on_timeout": False}
 
-# Endpoint for create internal ElasticSearch reindex task.
-ES_CREATE_TASK_ENDPOINT = "{es_host}/_reindex?pretty&wait_for_completion=false"
-ES_CHECK_TASK_ENDPOINT = "{es_host}/_tasks/{task_id}"
+# Default connection pool settings for shared ElasticSearch clients.
+DEFAULT_MAXSIZE = 25
+DEFAULT_HTTP_COMPRESS = True
+DEFAULT_SNIFF = False
+# Seconds between sniffing rounds when sniffing is enabled.
+DEFAULT_SNIFFER_TIMEOUT = 60
 
 # Logging message format.
 LOG_FORMAT = "[%(asctime)s] %(message)s"
 
 DEFAULT_CHECK_INTERVAL = 10
 DEFAULT_CONCURRENT_TASKS = 1
+
+# Client-side slicing of large indexes, reindex from remote does not support `slices`.
+DEFAULT_SLICES = 1
+# Only indexes with store size (bytes) above this value are sliced.
+DEFAULT_SLICE_MIN_SIZE = 5 * 1024 ** 3
+
+# Reindex from remote scroll batch size, socket and connect timeouts (ES defaults).
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_SOCKET_TIMEOUT = "1m"
+DEFAULT_CONNECT_TIMEOUT = "30s"
+
+# Live rethrottling: dest write thread pool queue length considered as pressure
+# and the lowest aggregate rate to back off to.
+DEFAULT_WRITE_QUEUE_HIGH = 100
+DEFAULT_MIN_DOCS_PER_SEC = 100
+
+# Reindex modes: server-side reindex from remote or client-side scroll/bulk streaming.
+MODE_REMOTE = "remote"
+MODE_STREAM = "stream"
+DEFAULT_MODE = MODE_REMOTE
+
+# Streaming mode: sliced scroll readers per index, bounded queue (documents)
+# between readers and bulk writers, bulk writer threads and max bulk request size.
+DEFAULT_STREAM_READERS = 2
+DEFAULT_STREAM_QUEUE_SIZE = 10000
+DEFAULT_BULK_THREADS = 4
+DEFAULT_MAX_CHUNK_BYTES = 10 * 1024 * 1024
+DEFAULT_SCROLL = "5m"
+
+# utils.bulk_insert: documents per bulk request and failed items kept in result.
+DEFAULT_BULK_CHUNK_SIZE = 500
+DEFAULT_MAX_BULK_ERRORS = 100
+
+# Pause between incremental passes of the sync command (in seconds).
+DEFAULT_SYNC_INTERVAL = 60
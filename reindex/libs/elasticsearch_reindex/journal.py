@@ -0,0 +1,172 @@
+"""
+Persistent checkpoint journal of reindex progress (sqlite).
+
+Every index is stored with its planned slices (source queries), the task id
+of every started slice and the final state, so a restarted run can reattach
+to tasks still running in Elasticsearch and only start what remains.
+"""
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .schema import SliceCheckpoint, TaskStatus
+
+STATE_PENDING = "pending"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS indexes (
+    name TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS slices (
+    index_name TEXT NOT NULL,
+    slice_no INTEGER NOT NULL,
+    query TEXT,
+    op_type TEXT,
+    task_id TEXT,
+    state TEXT NOT NULL,
+    created INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at INTEGER NOT NULL,
+    PRIMARY KEY (index_name, slice_no)
+);
+CREATE TABLE IF NOT EXISTS marks (
+    index_name TEXT PRIMARY KEY,
+    value REAL NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+"""
+
+
+class ReindexJournal:
+    """
+    Thread safe journal, written by the main thread and the task monitor thread.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def index_states(self) -> Dict[str, str]:
+        """
+        Return `{index: state}` of all journaled indexes.
+        """
+        with self._lock:
+            return dict(self.conn.execute("SELECT name, state FROM indexes"))
+
+    def get_slices(self, index_name: str) -> List[SliceCheckpoint]:
+        """
+        Return planned slices of index, empty list for a new index.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT slice_no, query, op_type, task_id, state FROM slices "
+                "WHERE index_name = ? ORDER BY slice_no",
+                (index_name,),
+            ).fetchall()
+        return [
+            SliceCheckpoint(
+                index_name=index_name,
+                slice_no=slice_no,
+                query=json.loads(query) if query else None,
+                op_type=op_type,
+                task_id=task_id,
+                state=state,
+            )
+            for slice_no, query, op_type, task_id, state in rows
+        ]
+
+    def plan_index(
+        self, index_name: str, queries: List[Optional[dict]], op_type: Optional[str] = None
+    ) -> List[SliceCheckpoint]:
+        """
+        Record a new index with its slices, replacing any previous plan.
+        """
+        now = int(time.time())
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM slices WHERE index_name = ?", (index_name,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO indexes (name, state, updated_at) VALUES (?, ?, ?)",
+                (index_name, STATE_RUNNING, now),
+            )
+            self.conn.executemany(
+                "INSERT INTO slices (index_name, slice_no, query, op_type, state, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (index_name, slice_no, json.dumps(query) if query else None, op_type, STATE_PENDING, now)
+                    for slice_no, query in enumerate(queries)
+                ],
+            )
+        return [
+            SliceCheckpoint(
+                index_name=index_name, slice_no=slice_no, query=query, op_type=op_type, state=STATE_PENDING
+            )
+            for slice_no, query in enumerate(queries)
+        ]
+
+    def start_slice(self, checkpoint: SliceCheckpoint, task_id: str) -> None:
+        checkpoint.task_id, checkpoint.state = task_id, STATE_RUNNING
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE slices SET task_id = ?, state = ?, updated_at = ? WHERE index_name = ? AND slice_no = ?",
+                (task_id, STATE_RUNNING, int(time.time()), checkpoint.index_name, checkpoint.slice_no),
+            )
+
+    def finish_slice(self, checkpoint: SliceCheckpoint, status: TaskStatus) -> None:
+        checkpoint.state = STATE_FAILED if status.error else STATE_DONE
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE slices SET state = ?, created = ?, total = ?, error = ?, updated_at = ? "
+                "WHERE index_name = ? AND slice_no = ?",
+                (
+                    checkpoint.state,
+                    status.created,
+                    status.total,
+                    status.error,
+                    int(time.time()),
+                    checkpoint.index_name,
+                    checkpoint.slice_no,
+                ),
+            )
+
+    def finish_index(self, index_name: str, ok: bool) -> None:
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE indexes SET state = ?, updated_at = ? WHERE name = ?",
+                (STATE_DONE if ok else STATE_FAILED, int(time.time()), index_name),
+            )
+
+    def reset_index(self, index_name: str) -> None:
+        """
+        Forget index, e.g. when its dest index was deleted after a finished run.
+        """
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM slices WHERE index_name = ?", (index_name,))
+            self.conn.execute("DELETE FROM indexes WHERE name = ?", (index_name,))
+
+    def get_marks(self) -> Dict[str, float]:
+        """
+        Return `{index: high-water mark}` of incremental sync.
+        """
+        with self._lock:
+            return dict(self.conn.execute("SELECT index_name, value FROM marks"))
+
+    def set_mark(self, index_name: str, value: float) -> None:
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO marks (index_name, value, updated_at) VALUES (?, ?, ?)",
+                (index_name, value, int(time.time())),
+            )
+
+    def close(self) -> None:
+        self.conn.close()
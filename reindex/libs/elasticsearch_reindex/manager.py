@@ -1,26 +1,72 @@
-import os
-from concurrent.futures import Future, ThreadPoolExecutor, as_completed
-from typing import Dict
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from time import monotonic, sleep
+from typing import Dict, List, Optional, Tuple
 
 from .client import ElasticsearchClient
-from .const import DEFAULT_CHECK_INTERVAL, DEFAULT_CONCURRENT_TASKS
+from .const import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_BULK_THREADS,
+    DEFAULT_CHECK_INTERVAL,
+    DEFAULT_CONCURRENT_TASKS,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_HTTP_COMPRESS,
+    DEFAULT_MAX_CHUNK_BYTES,
+    DEFAULT_MAXSIZE,
+    DEFAULT_MODE,
+    DEFAULT_SLICE_MIN_SIZE,
+    DEFAULT_SLICES,
+    DEFAULT_SNIFF,
+    DEFAULT_SOCKET_TIMEOUT,
+    DEFAULT_STREAM_QUEUE_SIZE,
+    DEFAULT_STREAM_READERS,
+    DEFAULT_SYNC_INTERVAL,
+    MODE_STREAM,
+)
+from .journal import STATE_DONE, STATE_FAILED, STATE_RUNNING, ReindexJournal
 from .logs import create_logger
-from .reindex import ReindexService
-from .schema import Config
+from .metrics import ReindexMetrics
+from .monitor import TaskMonitor
+from .reindex import ReindexService, get_range_query
+from .schedule import SizeSchedule, index_weight
+from .schema import Config, Index, IndexProgress, SliceCheckpoint, TaskStatus
+from .stream import StreamReindexer, Transform
+from .throttle import ReindexThrottle
 from .utils import check_migrated_indexes
 
 logger = create_logger(__name__)
 
+# Source queries of index sub-tasks and dest op_type.
+Plan = Tuple[List[Optional[dict]], Optional[str]]
+
+
+def get_diff_index(source: Index, dest: Index) -> Index:
+    """
+    Return index sized by work left to copy from source to dest.
+    """
+    return Index(
+        name=source.name,
+        docs_count=abs(source.docs_count - dest.docs_count),
+        store_size=max(source.store_size - dest.store_size, 0),
+    )
+
 
 class Manager:
     """
     Logic for input args handling.
     """
 
-    def __init__(self, config: Config) -> None:
+    def __init__(self, config: Config, transform: Optional[Transform] = None) -> None:
         self.config = config
         self.es_client = ElasticsearchClient(self.config)
         self.reindex_service = ReindexService(self.config)
+        self.stream_reindexer = StreamReindexer(self.config, transform=transform)
+        self.metrics = ReindexMetrics(
+            interval=self.config.check_interval,
+            textfile=self.config.metrics_file,
+            port=self.config.metrics_port,
+        )
 
     @classmethod
     def from_dict(cls, data: dict) -> "Manager":
@@ -33,12 +79,43 @@ class Manager:
             source_http_auth=data.get("source_http_auth", ""),
             dest_http_auth=data.get("dest_http_auth", ""),
             indexes=data.get("indexes", []),
-            check_interval=data.get("check_interval", DEFAULT_CHECK_INTERVAL),
-            concurrent_tasks=data.get("concurrent_tasks", DEFAULT_CONCURRENT_TASKS),
+            check_interval=data.get("check_interval") or DEFAULT_CHECK_INTERVAL,
+            concurrent_tasks=data.get("concurrent_tasks") or DEFAULT_CONCURRENT_TASKS,
+            maxsize=data.get("maxsize") or DEFAULT_MAXSIZE,
+            http_compress=data.get("http_compress", DEFAULT_HTTP_COMPRESS),
+            sniff=data.get("sniff", DEFAULT_SNIFF),
+            slices=data.get("slices") or DEFAULT_SLICES,
+            slice_field=data.get("slice_field"),
+            slice_min_size=(
+                DEFAULT_SLICE_MIN_SIZE
+                if data.get("slice_min_size") is None
+                else data["slice_min_size"]
+            ),
+            batch_size=data.get("batch_size") or DEFAULT_BATCH_SIZE,
+            requests_per_second=data.get("requests_per_second"),
+            socket_timeout=data.get("socket_timeout") or DEFAULT_SOCKET_TIMEOUT,
+            connect_timeout=data.get("connect_timeout") or DEFAULT_CONNECT_TIMEOUT,
+            target_docs_per_sec=data.get("target_docs_per_sec"),
+            peak_hours=data.get("peak_hours"),
+            adaptive_throttle=data.get("adaptive_throttle", False),
+            journal=data.get("journal"),
+            delta=data.get("delta", False),
+            delta_field=data.get("delta_field"),
+            sync_field=data.get("sync_field"),
+            sync_interval=data.get("sync_interval") or DEFAULT_SYNC_INTERVAL,
+            until_converged=data.get("until_converged", False),
+            max_passes=data.get("max_passes"),
+            mode=data.get("mode") or DEFAULT_MODE,
+            stream_readers=data.get("stream_readers") or DEFAULT_STREAM_READERS,
+            stream_queue_size=data.get("stream_queue_size") or DEFAULT_STREAM_QUEUE_SIZE,
+            bulk_threads=data.get("bulk_threads") or DEFAULT_BULK_THREADS,
+            max_chunk_bytes=data.get("max_chunk_bytes") or DEFAULT_MAX_CHUNK_BYTES,
+            metrics_file=data.get("metrics_file"),
+            metrics_port=data.get("metrics_port"),
         )
         config.source_http_auth = tuple(config.source_http_auth.split(":", 1)) if config.source_http_auth else None
         config.dest_http_auth = tuple(config.dest_http_auth.split(":", 1)) if config.dest_http_auth else None
-        return cls(config=config)
+        return cls(config=config, transform=data.get("transform"))
 
     def start_reindex(self) -> None:
         """
@@ -60,33 +137,386 @@ class Manager:
             f"Partial migrated ES indexes: {len(partial_migrated_indexes)}/{len(source_indexes)}"
         )
 
-        # Calculate max concurrent task depends on CPU count.
-        max_workers = min(self.config.concurrent_tasks, (os.cpu_count() or 1) * 5)
-        executor = ThreadPoolExecutor(max_workers=max_workers)
+        journal = ReindexJournal(path=self.config.journal or ":memory:")
+        indexes = self._get_resumable_indexes(
+            journal=journal,
+            not_migrated_indexes=not_migrated_indexes,
+            partial_migrated_indexes=partial_migrated_indexes,
+        )
 
-        futures = {}
-        for es_index in not_migrated_indexes:
-            kwargs = {
-                "es_index": es_index,
-                "check_interval": self.config.check_interval,
-            }
-            future = executor.submit(self.reindex_service.transfer_index, **kwargs)
-            futures[future] = es_index
+        source_sizes = {index.name: index for index in source_indexes}
+        delta_indexes: List[str] = []
+        planned: Dict[str, Plan] = {}
+        if self.config.delta:
+            delta_indexes = [name for name in partial_migrated_indexes if name not in indexes]
+            logger.info(f"Delta reindex ES indexes: {len(delta_indexes)}")
+            dest_sizes = {index.name: index for index in dest_indexes}
+            for name in delta_indexes:
+                # Previous delta pass is finished, plan a new one.
+                journal.reset_index(name)
+                source_sizes[name] = get_diff_index(source_sizes[name], dest_sizes[name])
+                planned[name] = ([self._get_delta_query(name)], "create")
 
-        self._process_result(futures=futures)
+        # Start the largest indexes first, so slots finish close to each other.
+        schedule = SizeSchedule(
+            indexes=[source_sizes[name] for name in indexes + delta_indexes],
+            slots=self.config.concurrent_tasks,
+        )
+        if schedule.order:
+            logger.info(
+                f"Scheduled {len(schedule.order)} indexes, {schedule.total} bytes. "
+                f"Largest: {schedule.order[0].name}. "
+                f"Planned bytes per slot: {schedule.makespan_share()}"
+            )
 
-    @staticmethod
-    def _process_result(futures: Dict[Future, str]) -> None:
+        try:
+            self._run_indexes(schedule=schedule, journal=journal, planned=planned)
+        finally:
+            journal.close()
+
+    def start_sync(self) -> None:
+        """
+        Copy indexes, then run incremental passes until converged or stopped.
+
+        Every pass copies documents with `sync_field` value not less than the
+        high-water mark of the index (source max value taken before the
+        previous pass), so writers can be switched once lag reaches zero.
+        """
+        self.start_reindex()
+
+        field = self.config.sync_field or self.config.delta_field or self.config.slice_field
+        if not field:
+            logger.warning("No sync field, every pass reads whole source indexes and copies missing documents")
+
+        journal = ReindexJournal(path=self.config.journal or ":memory:")
+        try:
+            pass_no = 0
+            while True:
+                pass_no += 1
+                converged = self._sync_pass(pass_no=pass_no, journal=journal, field=field)
+                if converged and self.config.until_converged:
+                    logger.info(f"Sync converged after {pass_no} passes")
+                    break
+                if self.config.max_passes and pass_no >= self.config.max_passes:
+                    break
+                sleep(self.config.sync_interval)
+        finally:
+            journal.close()
+
+    def _sync_pass(self, pass_no: int, journal: ReindexJournal, field: Optional[str]) -> bool:
         """
-        Process ThreadPoolExecutor tasks result.
+        Run one incremental pass, return True if source and dest were already in sync.
         """
-        for future in as_completed(futures):
-            index = futures[future]
-            try:
-                task_id = future.result()
-                futures.pop(future, None)
-            except Exception as exc:
-                logger.error(f"Index: {index} generated an exception: {exc}")
+        started = monotonic()
+        source_indexes = self.es_client.get_source_indexes()
+        dest_sizes = {index.name: index for index in self.es_client.get_dest_indexes()}
+        names = [index.name for index in source_indexes if index.name in dest_sizes]
+
+        # Source max values are taken before copying, they become the next marks.
+        source_max, dest_max = {}, {}
+        if field:
+            source_max = self.reindex_service.get_max_values(self.es_client.source_client, names, field)
+            dest_max = self.reindex_service.get_max_values(self.es_client.dest_client, names, field)
+        marks = journal.get_marks()
+
+        sizes: List[Index] = []
+        planned: Dict[str, Plan] = {}
+        lag: Dict[str, float] = {}
+        behind = 0
+        for index in source_indexes:
+            dest = dest_sizes.get(index.name)
+            if dest is None:
+                # New source index, copy it whole.
+                journal.reset_index(index.name)
+                sizes.append(index)
+                continue
+
+            source_value, is_date = source_max.get(index.name, (None, False))
+            dest_value = dest_max.get(index.name, (None, False))[0]
+            if source_value is not None and dest_value is not None:
+                lag[index.name] = (source_value - dest_value) / (1000 if is_date else 1)
+            behind += abs(index.docs_count - dest.docs_count)
+            if index.docs_count == dest.docs_count and source_value == dest_value:
+                continue
+
+            mark = marks.get(index.name, dest_value)
+            if mark is None or field is None:
+                planned[index.name] = ([None], "create")
             else:
-                logger.info(f"Task id: {task_id}. Reindex completed: {index}.")
-                logger.info(f"Tasks left: {len(futures)}")
+                planned[index.name] = ([get_range_query(field, mark, is_date)], None)
+            journal.reset_index(index.name)
+            sizes.append(get_diff_index(index, dest))
+
+        max_lag = max(lag.items(), key=lambda item: item[1], default=(None, 0))
+        logger.info(
+            f"Sync pass {pass_no}: indexes to sync: {len(sizes)}/{len(source_indexes)}. "
+            f"Documents behind: {behind}. Max lag: {max_lag[1]} ({max_lag[0]})"
+        )
+        if not sizes:
+            return True
+
+        schedule = SizeSchedule(indexes=sizes, slots=self.config.concurrent_tasks)
+        results = self._run_indexes(schedule=schedule, journal=journal, planned=planned)
+        for progress in results:
+            if not progress.errors and progress.name in source_max:
+                journal.set_mark(progress.name, source_max[progress.name][0])
+
+        logger.info(
+            f"Sync pass {pass_no} finished in {monotonic() - started:.1f}s. "
+            f"Created: {sum(progress.created for progress in results)}. "
+            f"Updated: {sum(progress.updated for progress in results)}. "
+            f"Failed indexes: {sum(bool(progress.errors) for progress in results)}"
+        )
+        return False
+
+    @staticmethod
+    def _get_resumable_indexes(
+        journal: ReindexJournal,
+        not_migrated_indexes: List[str],
+        partial_migrated_indexes: List[str],
+    ) -> List[str]:
+        """
+        Return not migrated indexes and partial migrated ones interrupted in a previous run.
+        """
+        states = journal.index_states()
+        for name in not_migrated_indexes:
+            # Dest index was removed after a finished run, migrate it again.
+            if states.get(name) == STATE_DONE:
+                journal.reset_index(name)
+
+        resumed = [
+            name for name in partial_migrated_indexes if states.get(name) in (STATE_RUNNING, STATE_FAILED)
+        ]
+        if resumed:
+            logger.info(f"Resumed from journal: {len(resumed)} partial migrated ES indexes")
+        return not_migrated_indexes + resumed
+
+    def _run_indexes(
+        self, schedule: SizeSchedule, journal: ReindexJournal, planned: Dict[str, Plan]
+    ) -> List[IndexProgress]:
+        """
+        Copy scheduled indexes with reindex from remote tasks or client-side streaming.
+        """
+        self.metrics.schedule = schedule
+        self.metrics.start()
+        try:
+            if self.config.mode == MODE_STREAM:
+                return self._run_streams(schedule=schedule, journal=journal, planned=planned)
+            return self._run_tasks(schedule=schedule, journal=journal, planned=planned)
+        finally:
+            self.metrics.write()
+
+    def _run_streams(
+        self, schedule: SizeSchedule, journal: ReindexJournal, planned: Dict[str, Plan]
+    ) -> List[IndexProgress]:
+        """
+        Stream up to `concurrent_tasks` indexes at once, slices of one index run one by one.
+        """
+        lock = threading.Lock()
+        pending = {"left": len(schedule.order)}
+
+        def run_index(index: Index) -> IndexProgress:
+            checkpoints = journal.get_slices(index.name)
+            if not checkpoints:
+                checkpoints = self._plan_index(index=index, journal=journal, planned=planned)
+            remaining = [checkpoint for checkpoint in checkpoints if checkpoint.state != STATE_DONE]
+            progress = IndexProgress(name=index.name, slices_left=len(remaining))
+            schedule.start(index.name)
+
+            for checkpoint in remaining:
+                task_id = f"stream:{index.name}:{checkpoint.slice_no}"
+                journal.start_slice(checkpoint, task_id)
+                status = TaskStatus(task_id=task_id)
+                self.metrics.track(status, index)
+                try:
+                    self.stream_reindexer.transfer_index(
+                        es_index=index.name, query=checkpoint.query, op_type=checkpoint.op_type, status=status
+                    )
+                except Exception as exc:
+                    status.completed, status.error = True, str(exc)
+                self.metrics.finish(status)
+                journal.finish_slice(checkpoint, status)
+                progress.slices[task_id] = status
+                progress.slices_left -= 1
+                if status.error:
+                    progress.errors.append(status.error)
+
+            with lock:
+                pending["left"] -= 1
+            journal.finish_index(progress.name, ok=not progress.errors)
+            self._report_index(progress=progress, schedule=schedule, left=pending["left"])
+            return progress
+
+        with ThreadPoolExecutor(max_workers=max(1, self.config.concurrent_tasks)) as executor:
+            return list(executor.map(run_index, schedule.order))
+
+    def _report_index(self, progress: IndexProgress, schedule: SizeSchedule, left: int) -> None:
+        """
+        Log finished index and overall progress.
+        """
+        schedule.finish(progress.name, migrated=not progress.errors)
+        if progress.errors:
+            logger.error(f"Index: {progress.name} generated an exception: {progress.errors}")
+        else:
+            logger.info(
+                f"Task id: {','.join(progress.slices)}. Reindex completed: {progress.name}. "
+                f"Migrated documents: {progress.created}/{progress.total}"
+            )
+        eta = schedule.eta()
+        logger.info(
+            f"Tasks left: {left}. "
+            f"Migrated: {schedule.done}/{schedule.total} bytes. "
+            f"ETA: {'unknown' if eta is None else f'{eta:.0f}s'}"
+        )
+
+    def _run_tasks(
+        self, schedule: SizeSchedule, journal: ReindexJournal, planned: Dict[str, Plan]
+    ) -> List[IndexProgress]:
+        """
+        Create reindex tasks (slices of large indexes) up to `concurrent_tasks` at once.
+
+        One monitor polls all running tasks, a slot is freed when a task finishes.
+        Tasks journaled as running are reattached instead of started again.
+        Indexes from `planned` use given source queries and op_type instead of slicing.
+        Return progress of all indexes.
+        """
+        throttle = ReindexThrottle(
+            es_client=self.es_client.dest_client,
+            requests_per_second=self.config.requests_per_second,
+            target_docs_per_sec=self.config.target_docs_per_sec,
+            peak_hours=self.config.peak_hours,
+            adaptive=self.config.adaptive_throttle,
+        )
+        monitor = TaskMonitor(
+            es_client=self.es_client.dest_client,
+            check_interval=self.config.check_interval,
+            on_poll=throttle.update,
+        ).start()
+        slots = threading.BoundedSemaphore(max(1, self.config.concurrent_tasks))
+        lock = threading.Lock()
+        pending = {"left": len(schedule.order)}
+        results: List[IndexProgress] = []
+
+        def on_slice_finished(
+            progress: IndexProgress, checkpoint: SliceCheckpoint, status: TaskStatus
+        ) -> None:
+            slots.release()
+            self.metrics.finish(status)
+            journal.finish_slice(checkpoint, status)
+            with lock:
+                if status.task_id:
+                    progress.slices[status.task_id] = status
+                if status.error:
+                    progress.errors.append(status.error)
+                progress.slices_left -= 1
+                if progress.slices_left:
+                    if len(progress.slices) > 1:
+                        logger.info(
+                            f"Index: {progress.name}. Slice finished: {status.task_id}. "
+                            f"Slices left: {progress.slices_left}. "
+                            f"Migrated documents: {progress.created}/{progress.total}"
+                        )
+                    return
+            on_index_finished(progress)
+
+        def on_index_finished(progress: IndexProgress) -> None:
+            with lock:
+                pending["left"] -= 1
+            journal.finish_index(progress.name, ok=not progress.errors)
+            self._report_index(progress=progress, schedule=schedule, left=pending["left"])
+
+        try:
+            for index in schedule.order:
+                checkpoints = journal.get_slices(index.name)
+                if not checkpoints:
+                    checkpoints = self._plan_index(index=index, journal=journal, planned=planned)
+                remaining = [checkpoint for checkpoint in checkpoints if checkpoint.state != STATE_DONE]
+                if len(remaining) < len(checkpoints):
+                    logger.info(f"Index: {index.name}. Slices done in previous run: {len(checkpoints) - len(remaining)}")
+
+                progress = IndexProgress(name=index.name, slices_left=len(remaining))
+                results.append(progress)
+                schedule.start(index.name)
+                if not remaining:
+                    on_index_finished(progress)
+                    continue
+
+                for checkpoint in remaining:
+                    slots.acquire()
+                    if (
+                        checkpoint.state == STATE_RUNNING
+                        and checkpoint.task_id
+                        and self.reindex_service.task_exists(checkpoint.task_id)
+                    ):
+                        task_id = checkpoint.task_id
+                        logger.info(f"Index: {index.name}. Reattached to task: {task_id}")
+                    else:
+                        rate = throttle.requests_per_second(running=self.config.concurrent_tasks)
+                        try:
+                            task_id = self.reindex_service.create_task(
+                                es_index=index.name,
+                                query=checkpoint.query,
+                                requests_per_second=rate,
+                                op_type=checkpoint.op_type,
+                            )
+                        except Exception as exc:
+                            on_slice_finished(
+                                progress, checkpoint, TaskStatus(task_id="", completed=True, error=str(exc))
+                            )
+                            continue
+                        throttle.track(task_id, rate)
+                        journal.start_slice(checkpoint, task_id)
+                    # Track the status before watching, the task may finish right away.
+                    status = TaskStatus(task_id=task_id)
+                    with lock:
+                        progress.slices[task_id] = status
+                    self.metrics.track(status, index)
+                    monitor.watch(
+                        task_id,
+                        callback=partial(on_slice_finished, progress, checkpoint),
+                        status=status,
+                    )
+            monitor.join()
+        finally:
+            monitor.stop()
+        return results
+
+    def _plan_index(
+        self, index: Index, journal: ReindexJournal, planned: Dict[str, Plan]
+    ) -> List[SliceCheckpoint]:
+        """
+        Journal reindex sub-tasks of index: planned queries or slices of the whole index.
+        """
+        if index.name in planned:
+            queries, op_type = planned[index.name]
+            return journal.plan_index(index.name, queries, op_type=op_type)
+        return journal.plan_index(index.name, self._get_slice_queries(index=index))
+
+    def _get_delta_query(self, es_index: str) -> Optional[dict]:
+        """
+        Return source query of delta task for partial migrated index.
+        """
+        try:
+            query = self.reindex_service.get_delta_query(es_index=es_index)
+        except Exception as exc:
+            logger.error(f"Index: {es_index}. Can not get delta position, copy all missing documents: {exc}")
+            query = None
+        logger.info(f"Index: {es_index}. Delta reindex query: {query}")
+        return query
+
+    def _get_slice_queries(self, index: Index) -> List[Optional[dict]]:
+        """
+        Return source queries of reindex sub-tasks, `[None]` for one unsliced task.
+        """
+        if self.config.slices <= 1 or index_weight(index) < self.config.slice_min_size:
+            return [None]
+        try:
+            queries = self.reindex_service.get_slice_queries(
+                es_index=index.name, slices=self.config.slices
+            )
+        except Exception as exc:
+            logger.error(f"Index: {index.name}. Can not split into slices: {exc}")
+            return [None]
+        if len(queries) > 1:
+            logger.info(f"Index: {index.name}. Split into {len(queries)} slices")
+        return queries
@@ -0,0 +1,227 @@
+"""
+Reindex throughput metrics in Prometheus text format.
+
+Per-task and aggregate docs/sec, bytes/sec (estimated from the source index
+average document size), ETA and throttle time are refreshed after every
+check interval. They are written to a textfile (node_exporter textfile
+collector) and/or served on a local HTTP `/metrics` endpoint.
+"""
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from .logs import create_logger
+from .schedule import SizeSchedule
+from .schema import Index, TaskStatus
+
+logger = create_logger(__name__)
+
+PREFIX = "es_reindex"
+
+
+class _Task:
+    __slots__ = ("status", "index", "doc_size", "started")
+
+    def __init__(self, status: TaskStatus, index: str, doc_size: float) -> None:
+        self.status = status
+        self.index = index
+        self.doc_size = doc_size
+        self.started = time.monotonic()
+
+    @property
+    def seconds(self) -> float:
+        if self.status.running_time_in_nanos:
+            return self.status.running_time_in_nanos / 1e9
+        return time.monotonic() - self.started
+
+    @property
+    def docs_per_sec(self) -> float:
+        seconds = self.seconds
+        return self.status.processed / seconds if seconds > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        rate = self.docs_per_sec
+        if not rate or not self.status.total:
+            return None
+        return max(self.status.total - self.status.processed, 0) / rate
+
+
+class ReindexMetrics:
+    """
+    Collect task statuses and render them, thread safe.
+    """
+
+    def __init__(
+        self,
+        interval: int,
+        schedule: Optional[SizeSchedule] = None,
+        textfile: Optional[str] = None,
+        port: Optional[int] = None,
+    ) -> None:
+        self.interval = interval
+        self.schedule = schedule
+        self.textfile = textfile
+        self.port = port
+        self._tasks: Dict[str, _Task] = {}
+        self._finished = {"tasks": 0, "failed": 0, "docs": 0, "bytes": 0.0, "throttled_millis": 0}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "ReindexMetrics":
+        """
+        Start periodic refresh and HTTP endpoint if `port` is set, repeated calls do nothing.
+        """
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run, name="reindex-metrics-refresh", daemon=True)
+        self._thread.start()
+        if self.port:
+            self._server = ThreadingHTTPServer(("127.0.0.1", self.port), _make_handler(self))
+            threading.Thread(target=self._server.serve_forever, name="reindex-metrics", daemon=True).start()
+            logger.info(f"Metrics endpoint: http://127.0.0.1:{self._server.server_address[1]}/metrics")
+        return self
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.update()
+            except Exception as exc:
+                logger.error(f"Can not refresh metrics: {exc}")
+
+    def track(self, status: TaskStatus, index: Index) -> None:
+        """
+        Start collecting metrics of task, status object is updated by the caller.
+        """
+        doc_size = index.store_size / index.docs_count if index.docs_count else 0.0
+        with self._lock:
+            self._tasks[status.task_id] = _Task(status=status, index=index.name, doc_size=doc_size)
+
+    def finish(self, status: TaskStatus) -> None:
+        with self._lock:
+            task = self._tasks.pop(status.task_id, None)
+            if task is None:
+                return
+            self._finished["tasks"] += 1
+            self._finished["failed"] += bool(status.error)
+            self._finished["docs"] += status.processed
+            self._finished["bytes"] += status.processed * task.doc_size
+            self._finished["throttled_millis"] += status.throttled_millis
+        self.write()
+
+    def update(self) -> None:
+        """
+        Write textfile and log throughput, statuses are updated by their owners.
+        """
+        self.write()
+        if not self._tasks:
+            return
+        docs_per_sec, bytes_per_sec = self.throughput()
+        logger.info(
+            f"Throughput: {docs_per_sec:.0f} docs/sec, {bytes_per_sec / 1024 ** 2:.1f} MiB/sec. "
+            f"Running tasks: {len(self._tasks)}"
+        )
+
+    def throughput(self) -> Tuple[float, float]:
+        with self._lock:
+            tasks = list(self._tasks.values())
+        docs_per_sec = sum(task.docs_per_sec for task in tasks)
+        bytes_per_sec = sum(task.docs_per_sec * task.doc_size for task in tasks)
+        return docs_per_sec, bytes_per_sec
+
+    def render(self) -> str:
+        """
+        Return metrics in Prometheus text exposition format.
+        """
+        with self._lock:
+            tasks = list(self._tasks.items())
+            finished = dict(self._finished)
+
+        lines: List[str] = []
+
+        def gauge(name: str, help_text: str, samples: List[Tuple[str, float]]) -> None:
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            lines.extend(f"{PREFIX}_{name}{labels} {value:g}" for labels, value in samples)
+
+        def labels(task_id: str, task: _Task) -> str:
+            return f'{{task_id="{task_id}",index="{task.index}"}}'
+
+        gauge("task_docs_total", "Documents to copy by task.",
+              [(labels(i, t), t.status.total) for i, t in tasks])
+        gauge("task_docs_processed", "Documents created, updated or conflicted by task.",
+              [(labels(i, t), t.status.processed) for i, t in tasks])
+        gauge("task_docs_per_second", "Task throughput in documents per second.",
+              [(labels(i, t), t.docs_per_sec) for i, t in tasks])
+        gauge("task_bytes_per_second", "Task throughput in bytes per second (source average document size).",
+              [(labels(i, t), t.docs_per_sec * t.doc_size) for i, t in tasks])
+        gauge("task_eta_seconds", "Estimated seconds left for task.",
+              [(labels(i, t), t.eta) for i, t in tasks if t.eta is not None])
+        gauge("task_throttled_seconds", "Seconds task was throttled by requests_per_second.",
+              [(labels(i, t), t.status.throttled_millis / 1000) for i, t in tasks])
+        gauge("task_batches", "Scroll batches processed by task.",
+              [(labels(i, t), t.status.batches) for i, t in tasks])
+        gauge("task_version_conflicts", "Version conflicts of task.",
+              [(labels(i, t), t.status.version_conflicts) for i, t in tasks])
+
+        docs_per_sec = sum(t.docs_per_sec for _, t in tasks)
+        remaining = sum(max(t.status.total - t.status.processed, 0) for _, t in tasks)
+        gauge("running_tasks", "Running reindex tasks.", [("", len(tasks))])
+        gauge("finished_tasks", "Finished reindex tasks.", [("", finished["tasks"])])
+        gauge("failed_tasks", "Failed reindex tasks.", [("", finished["failed"])])
+        gauge("docs_per_second", "Total throughput in documents per second.", [("", docs_per_sec)])
+        gauge("bytes_per_second", "Total throughput in bytes per second.",
+              [("", sum(t.docs_per_sec * t.doc_size for _, t in tasks))])
+        gauge("docs_processed", "Documents processed by finished and running tasks.",
+              [("", finished["docs"] + sum(t.status.processed for _, t in tasks))])
+        gauge("bytes_processed", "Estimated bytes processed by finished and running tasks.",
+              [("", finished["bytes"] + sum(t.status.processed * t.doc_size for _, t in tasks))])
+        gauge("throttled_seconds", "Seconds tasks were throttled by requests_per_second.",
+              [("", (finished["throttled_millis"] + sum(t.status.throttled_millis for _, t in tasks)) / 1000)])
+        if docs_per_sec:
+            gauge("running_eta_seconds", "Estimated seconds left for running tasks.",
+                  [("", remaining / docs_per_sec)])
+        if self.schedule is not None:
+            eta = self.schedule.eta()
+            gauge("schedule_bytes_total", "Bytes of all scheduled indexes.", [("", self.schedule.total)])
+            gauge("schedule_bytes_done", "Bytes of finished indexes.", [("", self.schedule.done)])
+            if eta is not None:
+                gauge("schedule_eta_seconds", "Estimated seconds left for all scheduled indexes.", [("", eta)])
+        return "\n".join(lines) + "\n"
+
+    def write(self) -> None:
+        """
+        Atomically replace the textfile, so collectors never read half written metrics.
+        """
+        if not self.textfile:
+            return
+        tmp = f"{self.textfile}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                f.write(self.render())
+            os.replace(tmp, self.textfile)
+        except OSError as exc:
+            logger.error(f"Can not write metrics to {self.textfile}: {exc}")
+
+
+def _make_handler(metrics: ReindexMetrics) -> type:
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            data = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args: object) -> None:
+            pass
+
+    return MetricsHandler
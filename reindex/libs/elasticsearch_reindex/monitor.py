@@ -0,0 +1,172 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from elasticsearch import Elasticsearch, exceptions
+
+from .logs import create_logger
+from .schema import TaskStatus
+
+logger = create_logger(__name__)
+
+TaskCallback = Callable[[TaskStatus], None]
+PollCallback = Callable[[List[TaskStatus]], None]
+
+
+class TaskMonitor:
+    """
+    Track every in-flight reindex task with one `_tasks` call per interval.
+
+    Tasks that disappear from the running list are fetched once by id to read
+    their final result, then their waiters and callbacks are released.
+    """
+
+    def __init__(
+        self,
+        es_client: Elasticsearch,
+        check_interval: int,
+        on_poll: Optional[PollCallback] = None,
+    ) -> None:
+        """
+        :param on_poll: Called after every poll with statuses of watched running tasks.
+        """
+        self.es_client = es_client
+        self.check_interval = check_interval
+        self.on_poll = on_poll
+        self._statuses: Dict[str, TaskStatus] = {}
+        self._events: Dict[str, threading.Event] = {}
+        self._callbacks: Dict[str, Optional[TaskCallback]] = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "TaskMonitor":
+        """
+        Start polling in a background thread.
+        """
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="task-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop polling.
+        """
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+
+    def watch(
+        self,
+        task_id: str,
+        callback: Optional[TaskCallback] = None,
+        status: Optional[TaskStatus] = None,
+    ) -> threading.Event:
+        """
+        Register task, `callback` is called from the monitor thread on completion.
+
+        :param status: Status object to update, register it elsewhere (e.g. metrics) before watching,
+            the task may complete right after this call.
+        """
+        with self._lock:
+            self._statuses[task_id] = status or TaskStatus(task_id=task_id)
+            self._callbacks[task_id] = callback
+            event = self._events[task_id] = threading.Event()
+        return event
+
+    def wait(self, task_id: str) -> TaskStatus:
+        """
+        Block until task completes and return its final status.
+        """
+        self._events[task_id].wait()
+        return self._statuses[task_id]
+
+    def join(self) -> None:
+        """
+        Block until all watched tasks complete.
+        """
+        with self._idle:
+            self._idle.wait_for(lambda: not self._callbacks)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.check_interval):
+            if not self._callbacks:
+                continue
+            try:
+                self.poll()
+            except Exception as exc:
+                logger.error(f"Can not poll reindex tasks: {exc}")
+
+    def poll(self) -> None:
+        """
+        Refresh all watched tasks with a single `_tasks` request.
+        """
+        response = self.es_client.tasks.list(actions="*reindex", detailed=True)
+        running = {}
+        for node in response.get("nodes", {}).values():
+            running.update(node.get("tasks", {}))
+
+        with self._lock:
+            watched = list(self._callbacks)
+
+        for task_id in watched:
+            task = running.get(task_id)
+            if task is not None:
+                self._update(task_id, task)
+                continue
+            # Task left the running list, read its final result once.
+            self._complete(task_id)
+
+        logger.info(f"Running reindex tasks: {len(running)}. Watched: {len(watched)}")
+
+        if self.on_poll:
+            try:
+                self.on_poll([self._statuses[task_id] for task_id in watched if task_id in running])
+            except Exception as exc:
+                logger.error(f"Can not handle polled reindex tasks: {exc}")
+
+    def _update(self, task_id: str, task: dict) -> None:
+        status = self._statuses[task_id]
+        task_status = task.get("status", {})
+        status.total = task_status.get("total", 0)
+        status.created = task_status.get("created", 0)
+        status.updated = task_status.get("updated", 0)
+        status.batches = task_status.get("batches", 0)
+        status.version_conflicts = task_status.get("version_conflicts", 0)
+        status.throttled_millis = task_status.get("throttled_millis", 0)
+        status.running_time_in_nanos = task.get("running_time_in_nanos", 0)
+        logger.info(
+            f"Task id: {task_id}. "
+            f"Migrated documents: {status.created}/{status.total}"
+        )
+
+    def _complete(self, task_id: str) -> None:
+        response: Dict[str, Any]
+        try:
+            response = self.es_client.tasks.get(task_id=task_id)
+        except exceptions.TransportError as e:
+            # Unknown or malformed task id will never complete, release its waiters.
+            if e.status_code != 404 and e.error != "illegal_argument_exception":
+                raise
+            response = {"completed": True, "error": {"reason": f"invalid task id: {e.error}"}}
+
+        if not response.get("completed"):
+            self._update(task_id, response["task"])
+            return
+
+        status = self._statuses[task_id]
+        if "task" in response:
+            self._update(task_id, response["task"])
+        failures = response.get("response", {}).get("failures")
+        error = response.get("error") or (failures[0] if failures else None)
+        if error:
+            status.error = str(error.get("reason", error) if isinstance(error, dict) else error)
+        status.completed = True
+
+        with self._lock:
+            callback = self._callbacks.pop(task_id, None)
+            self._events[task_id].set()
+            self._idle.notify_all()
+        if callback:
+            callback(status)
@@ -0,0 +1,91 @@
+"""
+Process-wide pool of shared Elasticsearch clients.
+
+Every client is keyed by its hosts and HTTP auth, so repeated lookups reuse
+the same urllib3 connection pool (kept-alive TCP/TLS connections) instead of
+building a new client and pinging the server each time.
+"""
+import json
+import threading
+from typing import Any, Dict, Optional, Tuple, Union
+
+from elasticsearch import Elasticsearch
+
+from .const import (
+    DEFAULT_ES_KWARGS,
+    DEFAULT_HTTP_COMPRESS,
+    DEFAULT_MAXSIZE,
+    DEFAULT_SNIFF,
+    DEFAULT_SNIFFER_TIMEOUT,
+)
+
+_clients: Dict[Tuple[str, str], Elasticsearch] = {}
+_lock = threading.Lock()
+
+
+def pool_kwargs(
+    maxsize: int = DEFAULT_MAXSIZE,
+    http_compress: bool = DEFAULT_HTTP_COMPRESS,
+    sniff: bool = DEFAULT_SNIFF,
+    **kwargs: Any,
+) -> Dict[str, Any]:
+    """
+    Return client init arguments for connection pooling, compression and sniffing.
+    """
+    options = {
+        **DEFAULT_ES_KWARGS,
+        "maxsize": maxsize,
+        "http_compress": http_compress,
+    }
+    if sniff:
+        options.update(
+            sniff_on_start=True,
+            sniff_on_connection_fail=True,
+            sniffer_timeout=DEFAULT_SNIFFER_TIMEOUT,
+        )
+    options.update(kwargs)
+    return options
+
+
+def get_client(
+    hosts: Any,
+    http_auth: Optional[Union[str, Tuple[str, str]]] = None,
+    ping: bool = False,
+    **kwargs: Any,
+) -> Elasticsearch:
+    """
+    Return the shared client for `hosts` and `http_auth`, creating it on first use.
+
+    :param hosts: Anything accepted by `Elasticsearch(hosts=...)`.
+    :param http_auth: HTTP Basic authentication, username and password.
+    :param ping: Call `info()` once when the client is created.
+    :param kwargs: Passed to `pool_kwargs`, only used when the client is created.
+    """
+    key = (_key(hosts), _key(http_auth))
+    with _lock:
+        client = _clients.get(key)
+        if client is not None:
+            return client
+
+        options = pool_kwargs(**kwargs)
+        if http_auth:
+            options["http_auth"] = http_auth
+        client = Elasticsearch(hosts=hosts, **options)
+        if ping:
+            client.info()
+        _clients[key] = client
+        return client
+
+
+def close_clients() -> None:
+    """
+    Close all shared clients and their connection pools.
+    """
+    with _lock:
+        for client in _clients.values():
+            client.transport.close()
+        _clients.clear()
+
+
+def _key(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, default=str)
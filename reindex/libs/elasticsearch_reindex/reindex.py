@@ -1,27 +1,39 @@
 from time import sleep
-from typing import Dict, Optional, Tuple, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-import requests
+from elasticsearch import Elasticsearch, exceptions
 
 from .client import ElasticsearchClient
-from .const import (
-    ES_CHECK_TASK_ENDPOINT,
-    ES_CREATE_TASK_ENDPOINT,
-    HEADERS,
-)
 from .errors import (
     ES_TASK_ID_ERROR,
     ElasticSearchInvalidTaskIDException,
 )
 from .logs import create_logger
+from .monitor import TaskMonitor
 from .schema import Config
+from .utils import chunkify
 
 logger = create_logger(__name__)
 
+# Indexes per search request when collecting max field values.
+MAX_VALUES_BATCH = 100
+
+
+def get_range_query(field: str, value: float, is_date: bool) -> dict:
+    """
+    Return source query for documents with field value not less than `value`.
+    """
+    if is_date:
+        return {"range": {field: {"gte": int(value), "format": "epoch_millis"}}}
+    return {"range": {field: {"gte": value}}}
+
 
 class ReindexService:
     """
     This class provide simple interface to ElasticSearch reindex API.
+
+    All requests go through the shared, pooled dest client, so worker threads
+    reuse kept-alive connections and one set of timeout/retry settings.
     """
 
     def __init__(self, config: Config):
@@ -32,26 +44,35 @@ class ReindexService:
         self,
         es_index: str,
         check_interval: int = 10,
+        monitor: Optional[TaskMonitor] = None,
     ) -> str:
         """
         Create reindex task and waiting for finish this task.
 
         :param es_index: Elasticsearch index.
         :param check_interval: Period of request task status (in seconds).
+        :param monitor: Shared task monitor, the worker sleeps until it
+            reports the task finished instead of polling on its own.
         """
-        task_id = self._create_reindex_task(es_index=es_index)
-        logger.info(f"Got task for migrate data: {task_id}")
+        task_id = self.create_task(es_index=es_index)
+
+        if monitor is not None:
+            monitor.watch(task_id)
+            monitor.wait(task_id)
+            logger.info(f"Task finished: {task_id}")
+            return task_id
 
         # Wait for Elasticsearch manage input task.
         sleep(2)
 
         while True:
-            completed, status = self._check_task_completed(
-                dest_es_host=self.config.dest_host, task_id=task_id, dest_http_auth=self.config.dest_http_auth
-            )
+            completed, status = self._check_task_completed(task_id=task_id)
             logger.info(
                 f"Task id: {task_id}. "
-                f"Migrated documents: {status['created']}/{status['total']}"
+                f"Migrated documents: {status['created']}/{status['total']}. "
+                f"Updated: {status['updated']}. Version conflicts: {status['version_conflicts']}. "
+                f"Batches: {status['batches']}. Throttled: {status['throttled_millis']}ms. "
+                f"Running: {status['running_time_in_nanos'] / 1e9:.0f}s"
             )
             if not completed:
                 sleep(check_interval)
@@ -62,51 +83,198 @@ class ReindexService:
 
         return task_id
 
-    def _create_reindex_task(self, es_index: str) -> str:
+    def create_task(
+        self,
+        es_index: str,
+        query: Optional[dict] = None,
+        requests_per_second: Optional[float] = None,
+        op_type: Optional[str] = None,
+    ) -> str:
         """
         Create reindex task via Elasticsearch API.
+
+        :param query: Source query, used to reindex one slice of the index.
+        :param requests_per_second: Task throttle, `config.requests_per_second` by default.
+        :param op_type: Dest op_type, `create` only writes documents missing in dest index.
         """
-        endpoint = ES_CREATE_TASK_ENDPOINT.format(es_host=self.config.dest_host)
-        reindex_payload = self._get_reindex_body(es_index=es_index)
-        response = requests.post(url=endpoint, json=reindex_payload, headers=HEADERS, auth=self.config.dest_http_auth)
-        task_id = response.json()["task"]
+        reindex_payload = self._get_reindex_body(es_index=es_index, query=query, op_type=op_type)
+        if requests_per_second is None:
+            requests_per_second = self.config.requests_per_second
+        # None (or 0) is left out of the query string, the task is not throttled.
+        response = self._es_service.dest_client.reindex(
+            body=reindex_payload,
+            wait_for_completion=False,
+            requests_per_second=requests_per_second or None,
+        )
+        task_id = response["task"]
+        logger.info(f"Got task for migrate data: {task_id}")
         return task_id
 
-    @staticmethod
-    def _check_task_completed(
-        dest_es_host: str, task_id: str, dest_http_auth: Optional[Tuple[str]] = None
-    ) -> Tuple[bool, Dict[str, int]]:
+    def task_exists(self, task_id: str) -> bool:
         """
-        Make request to Elasticsearch Tasks API and check task status.
+        Check if task is known to Elasticsearch (running or with stored result).
         """
-        endpoint = ES_CHECK_TASK_ENDPOINT.format(es_host=dest_es_host, task_id=task_id)
-        response = requests.get(url=endpoint, auth=dest_http_auth).json()
+        try:
+            self._check_task_completed(task_id=task_id)
+        except (exceptions.NotFoundError, ElasticSearchInvalidTaskIDException):
+            return False
+        return True
 
-        if (
-            "error" in response
-            and response["error"]["type"] == "illegal_argument_exception"
-        ):
-            raise ElasticSearchInvalidTaskIDException(
-                message=ES_TASK_ID_ERROR.format(host=dest_es_host, task_id=task_id)
-            )
+    def _check_task_completed(self, task_id: str) -> Tuple[bool, Dict[str, int]]:
+        """
+        Make request to Elasticsearch Tasks API and check task status.
+        """
+        try:
+            response = self._es_service.dest_client.tasks.get(task_id=task_id)
+        except exceptions.TransportError as e:
+            if e.error == "illegal_argument_exception":
+                raise ElasticSearchInvalidTaskIDException(
+                    message=ES_TASK_ID_ERROR.format(
+                        host=self.config.dest_host, task_id=task_id
+                    )
+                )
+            raise
 
         response_status = response["task"]["status"]
 
         data = {
             "total": response_status["total"],
             "created": response_status["created"],
+            "updated": response_status.get("updated", 0),
+            "batches": response_status.get("batches", 0),
+            "version_conflicts": response_status.get("version_conflicts", 0),
+            "throttled_millis": response_status.get("throttled_millis", 0),
+            "running_time_in_nanos": response["task"].get("running_time_in_nanos", 0),
         }
         return response["completed"], data
 
-    def _get_reindex_body(self, es_index: str) -> Dict[str, Union[str, dict]]:
+    def get_slice_queries(self, es_index: str, slices: int) -> List[Optional[dict]]:
+        """
+        Split index into `slices` source queries for concurrent reindex sub-tasks.
+
+        Reindex from remote does not support `slices`, so the index is split on
+        the client: by equal value ranges of `slice_field` (min/max taken from
+        the source index) or, without `slice_field`, by `_id` hash.
+        Documents without `slice_field` are copied by the first range slice.
+        Return `[None]` when the index can not be split.
+        """
+        if slices <= 1:
+            return [None]
+
+        field = self.config.slice_field
+        if not field:
+            return [
+                {
+                    "script": {
+                        "script": {
+                            "source": "Math.floorMod(doc['_id'].value.hashCode(), params.n) == params.i",
+                            "params": {"n": slices, "i": i},
+                        }
+                    }
+                }
+                for i in range(slices)
+            ]
+
+        response = self._es_service.source_client.search(
+            index=es_index,
+            size=0,
+            body={"aggs": {"min": {"min": {"field": field}}, "max": {"max": {"field": field}}}},
+            http_auth=self.config.source_http_auth,
+        )
+        aggs = response.get("aggregations", {})
+        low, high = aggs.get("min", {}).get("value"), aggs.get("max", {}).get("value")
+        if low is None or high is None or low >= high:
+            return [None]
+
+        # Date fields return epoch millis, keep bounds integral for them.
+        is_date = "value_as_string" in aggs["min"]
+        step = (high - low) / slices
+        bounds = [low + step * i for i in range(slices)] + [high]
+        if is_date:
+            bounds = [int(bound) for bound in bounds]
+
+        queries: List[Optional[dict]] = []
+        for i in range(slices):
+            lt_key = "lte" if i == slices - 1 else "lt"
+            condition = {"gte": bounds[i], lt_key: bounds[i + 1]}
+            if is_date:
+                condition["format"] = "epoch_millis"
+            queries.append({"range": {field: condition}})
+        queries[0] = {"bool": {"should": [queries[0], {"bool": {"must_not": {"exists": {"field": field}}}}]}}
+        return queries
+
+    def get_delta_query(self, es_index: str) -> Optional[dict]:
+        """
+        Return source query for documents newer than the latest one in dest index.
+
+        Documents equal to the dest max value are included, as the dest may have
+        only part of them, `op_type: create` skips the ones already copied.
+        Return None (copy all missing documents) without `delta_field` or dest value.
+        """
+        field = self.config.delta_field or self.config.slice_field
+        if not field:
+            return None
+
+        max_values = self.get_max_values(
+            es_client=self._es_service.dest_client, es_indexes=[es_index], field=field
+        )
+        if es_index not in max_values:
+            return None
+        return get_range_query(field, *max_values[es_index])
+
+    @staticmethod
+    def get_max_values(
+        es_client: Elasticsearch, es_indexes: List[str], field: str
+    ) -> Dict[str, Tuple[float, bool]]:
+        """
+        Return `{index: (max value of field, is date field)}` with one search per batch of indexes.
+
+        Indexes without any value of field are omitted.
+        """
+        result = {}
+        for names in chunkify(lst=es_indexes, n=MAX_VALUES_BATCH):
+            response = es_client.search(
+                index=",".join(names),
+                size=0,
+                ignore_unavailable=True,
+                body={
+                    "aggs": {
+                        "indexes": {
+                            "terms": {"field": "_index", "size": len(names)},
+                            "aggs": {"max": {"max": {"field": field}}},
+                        }
+                    }
+                },
+            )
+            for bucket in response.get("aggregations", {}).get("indexes", {}).get("buckets", []):
+                value = bucket["max"].get("value")
+                if value is not None:
+                    result[bucket["key"]] = (value, "value_as_string" in bucket["max"])
+        return result
+
+    def _get_reindex_body(
+        self, es_index: str, query: Optional[dict] = None, op_type: Optional[str] = None
+    ) -> Dict[str, Union[str, dict]]:
         """
         Return ElasticSearch reindex body for API request.
         """
-        body = {
-            "source": {"remote": {"host": self.config.source_host}, "index": es_index},
+        body: Dict[str, Any] = {
+            "source": {
+                "remote": {
+                    "host": self.config.source_host,
+                    "socket_timeout": self.config.socket_timeout,
+                    "connect_timeout": self.config.connect_timeout,
+                },
+                "index": es_index,
+                "size": self.config.batch_size,
+            },
             "conflicts": "proceed",
             "dest": {"index": es_index},
         }
+        if query:
+            body["source"]["query"] = query
+        if op_type:
+            body["dest"]["op_type"] = op_type
         if self.config.source_http_auth:
             body["source"]["remote"]["username"], body["source"]["remote"]["password"] = self.config.source_http_auth
         return body
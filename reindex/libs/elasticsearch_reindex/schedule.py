@@ -0,0 +1,75 @@
+import heapq
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .schema import Index
+
+
+def index_weight(index: Index) -> int:
+    """
+    Estimated work for reindex, store size in bytes or documents count for empty stats.
+    """
+    return index.store_size or index.docs_count
+
+
+class SizeSchedule:
+    """
+    Largest-first (LPT) order of reindex work and completion time estimate.
+
+    Tasks are started in descending size as slots free up, so the biggest
+    index never starts last and dominates the total migration time.
+    """
+
+    def __init__(self, indexes: List[Index], slots: int) -> None:
+        self.slots = max(1, slots)
+        self.order = sorted(indexes, key=index_weight, reverse=True)
+        self.total = sum(index_weight(index) for index in self.order)
+        self.done = 0
+        self._weights: Dict[str, int] = {index.name: index_weight(index) for index in self.order}
+        self._started: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._start_time = time.monotonic()
+
+    def makespan_share(self) -> List[int]:
+        """
+        Return planned work per slot for greedy largest-first assignment.
+        """
+        loads = [0] * self.slots
+        heapq.heapify(loads)
+        for index in self.order:
+            heapq.heappush(loads, heapq.heappop(loads) + index_weight(index))
+        return sorted(loads, reverse=True)
+
+    def start(self, name: str) -> None:
+        with self._lock:
+            self._started[name] = time.monotonic()
+
+    def finish(self, name: str, migrated: bool = True) -> None:
+        with self._lock:
+            self._started.pop(name, None)
+            weight = self._weights.get(name, 0)
+            if migrated:
+                self.done += weight
+            else:
+                self.total -= weight
+
+    def eta(self) -> Optional[float]:
+        """
+        Return estimated seconds left, None until the first task finished.
+
+        Aggregate throughput bounds the remaining work, the largest unfinished
+        index bounds the tail as it runs in a single slot.
+        """
+        with self._lock:
+            elapsed = time.monotonic() - self._start_time
+            if not self.done or elapsed <= 0:
+                return None
+            rate = self.done / elapsed
+            remaining = self.total - self.done
+            running = [
+                self._weights[name] - rate / self.slots * (time.monotonic() - started)
+                for name, started in self._started.items()
+            ]
+        tail = max(running, default=0) / (rate / self.slots)
+        return max(remaining / rate, tail, 0)
@@ -1,7 +1,24 @@
-from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
 
-from .const import DEFAULT_CHECK_INTERVAL, DEFAULT_CONCURRENT_TASKS
+from .const import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_BULK_THREADS,
+    DEFAULT_CHECK_INTERVAL,
+    DEFAULT_CONCURRENT_TASKS,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_HTTP_COMPRESS,
+    DEFAULT_MAX_CHUNK_BYTES,
+    DEFAULT_MAXSIZE,
+    DEFAULT_MODE,
+    DEFAULT_SLICE_MIN_SIZE,
+    DEFAULT_SLICES,
+    DEFAULT_SNIFF,
+    DEFAULT_SOCKET_TIMEOUT,
+    DEFAULT_STREAM_QUEUE_SIZE,
+    DEFAULT_STREAM_READERS,
+    DEFAULT_SYNC_INTERVAL,
+)
 
 
 @dataclass
@@ -12,6 +29,78 @@ class Index:
 
     name: str
     docs_count: int
+    store_size: int = 0
+
+
+@dataclass
+class BulkResult:
+    """
+    Dataclass for storing bulk insert result, `errors` are failed bulk items.
+    """
+
+    success: int = 0
+    failed: int = 0
+    errors: List[dict] = field(default_factory=list)
+
+
+@dataclass
+class TaskStatus:
+    """
+    Dataclass for storing ES reindex task progress.
+    """
+
+    task_id: str
+    completed: bool = False
+    total: int = 0
+    created: int = 0
+    updated: int = 0
+    batches: int = 0
+    version_conflicts: int = 0
+    throttled_millis: int = 0
+    running_time_in_nanos: int = 0
+    error: Optional[str] = None
+
+    @property
+    def processed(self) -> int:
+        return self.created + self.updated + self.version_conflicts
+
+
+@dataclass
+class SliceCheckpoint:
+    """
+    Dataclass for storing journaled state of one reindex sub-task (slice).
+    """
+
+    index_name: str
+    slice_no: int
+    query: Optional[dict] = None
+    op_type: Optional[str] = None
+    task_id: Optional[str] = None
+    state: str = "pending"
+
+
+@dataclass
+class IndexProgress:
+    """
+    Dataclass for merging progress of index reindex sub-tasks (slices).
+    """
+
+    name: str
+    slices_left: int = 1
+    slices: Dict[str, TaskStatus] = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return sum(status.total for status in self.slices.values())
+
+    @property
+    def created(self) -> int:
+        return sum(status.created for status in self.slices.values())
+
+    @property
+    def updated(self) -> int:
+        return sum(status.updated for status in self.slices.values())
 
 
 @dataclass
@@ -27,3 +116,30 @@ class Config:
     indexes: Optional[List[str]]
     concurrent_tasks: int = DEFAULT_CONCURRENT_TASKS
     check_interval: int = DEFAULT_CHECK_INTERVAL
+    maxsize: int = DEFAULT_MAXSIZE
+    http_compress: bool = DEFAULT_HTTP_COMPRESS
+    sniff: bool = DEFAULT_SNIFF
+    slices: int = DEFAULT_SLICES
+    slice_field: Optional[str] = None
+    slice_min_size: int = DEFAULT_SLICE_MIN_SIZE
+    batch_size: int = DEFAULT_BATCH_SIZE
+    requests_per_second: Optional[float] = None
+    socket_timeout: str = DEFAULT_SOCKET_TIMEOUT
+    connect_timeout: str = DEFAULT_CONNECT_TIMEOUT
+    target_docs_per_sec: Optional[float] = None
+    peak_hours: Optional[str] = None
+    adaptive_throttle: bool = False
+    journal: Optional[str] = None
+    delta: bool = False
+    delta_field: Optional[str] = None
+    sync_field: Optional[str] = None
+    sync_interval: int = DEFAULT_SYNC_INTERVAL
+    until_converged: bool = False
+    max_passes: Optional[int] = None
+    mode: str = DEFAULT_MODE
+    stream_readers: int = DEFAULT_STREAM_READERS
+    stream_queue_size: int = DEFAULT_STREAM_QUEUE_SIZE
+    bulk_threads: int = DEFAULT_BULK_THREADS
+    max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES
+    metrics_file: Optional[str] = None
+    metrics_port: Optional[int] = None
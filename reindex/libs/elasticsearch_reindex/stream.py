@@ -0,0 +1,195 @@
+"""
+Client-side streaming reindex: scroll readers -> bounded queue -> bulk writers.
+
+Unlike reindex from remote it does not need `reindex.remote.whitelist` on the
+dest cluster and can transform documents. Memory stays constant: readers
+block when the queue is full, writers send chunks limited in documents and
+bytes.
+"""
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from elasticsearch.helpers import parallel_bulk, scan
+
+from .client import ElasticsearchClient
+from .const import DEFAULT_SCROLL
+from .logs import create_logger
+from .schema import Config, TaskStatus
+
+logger = create_logger(__name__)
+
+# Transform source document, return None to skip it.
+Transform = Callable[[dict], Optional[dict]]
+
+# Keep first errors only, a broken mapping fails every document the same way.
+MAX_ERRORS = 10
+
+_DONE = object()
+
+
+class StreamReindexer:
+    """
+    Copy one index (or part of it by query) with sliced scroll and parallel bulk.
+    """
+
+    def __init__(self, config: Config, transform: Optional[Transform] = None) -> None:
+        self.config = config
+        self.transform = transform
+        self._es_service = ElasticsearchClient(config)
+
+    def transfer_index(
+        self,
+        es_index: str,
+        query: Optional[dict] = None,
+        op_type: Optional[str] = None,
+        status: Optional[TaskStatus] = None,
+    ) -> TaskStatus:
+        """
+        Stream documents to dest index, return merged counts as task status.
+
+        :param query: Source query, used to copy one slice or delta of the index.
+        :param op_type: Dest op_type, `create` only writes documents missing in dest index.
+        :param status: Status updated while streaming, e.g. tracked by metrics.
+        """
+        status = status or TaskStatus(task_id=f"stream:{es_index}")
+        status.total = self._source_count(es_index=es_index, query=query)
+        readers = max(1, self.config.stream_readers)
+        docs: "queue.Queue[Any]" = queue.Queue(maxsize=self.config.stream_queue_size)
+        stop = threading.Event()
+        errors: List[str] = []
+
+        threads = [
+            threading.Thread(
+                target=self._read,
+                kwargs={
+                    "es_index": es_index,
+                    "query": query,
+                    "slice_id": slice_id,
+                    "readers": readers,
+                    "docs": docs,
+                    "stop": stop,
+                    "errors": errors,
+                },
+                name=f"stream-reader-{es_index}-{slice_id}",
+                daemon=True,
+            )
+            for slice_id in range(readers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            results = parallel_bulk(
+                client=self._es_service.dest_client,
+                actions=self._actions(docs=docs, readers=readers, es_index=es_index, op_type=op_type),
+                thread_count=self.config.bulk_threads,
+                chunk_size=self.config.batch_size,
+                max_chunk_bytes=self.config.max_chunk_bytes,
+                raise_on_error=False,
+                raise_on_exception=False,
+            )
+            for ok, item in results:
+                self._count(status=status, ok=ok, item=item, errors=errors)
+        finally:
+            stop.set()
+            # Unblock readers waiting on a full queue.
+            while any(thread.is_alive() for thread in threads):
+                try:
+                    docs.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+        status.completed = True
+        if errors:
+            status.error = "; ".join(errors[:MAX_ERRORS])
+        logger.info(
+            f"Stream finished: {es_index}. Created: {status.created}. Updated: {status.updated}. "
+            f"Conflicts: {status.version_conflicts}. Errors: {len(errors)}"
+        )
+        return status
+
+    def _source_count(self, es_index: str, query: Optional[dict]) -> int:
+        """
+        Count source documents matching the query, the same total as a server-side reindex task reports.
+        """
+        try:
+            res = self._es_service.source_client.count(index=es_index, body={"query": query or {"match_all": {}}})
+            return int(res["count"])
+        except Exception as exc:
+            logger.warning(f"Index: {es_index}. Source count failed: {exc}")
+            return 0
+
+    def _read(
+        self,
+        es_index: str,
+        query: Optional[dict],
+        slice_id: int,
+        readers: int,
+        docs: "queue.Queue[Any]",
+        stop: threading.Event,
+        errors: List[str],
+    ) -> None:
+        """
+        Scroll one slice of source index into the queue, blocks while the queue is full.
+        """
+        body: Dict[str, Any] = {"query": query or {"match_all": {}}}
+        if readers > 1:
+            body["slice"] = {"id": slice_id, "max": readers}
+        try:
+            for hit in scan(
+                self._es_service.source_client,
+                query=body,
+                index=es_index,
+                size=self.config.batch_size,
+                scroll=DEFAULT_SCROLL,
+            ):
+                if stop.is_set():
+                    return
+                docs.put(hit)
+        except Exception as exc:
+            logger.error(f"Index: {es_index}. Stream reader {slice_id} failed: {exc}")
+            errors.append(f"reader {slice_id}: {exc}")
+        finally:
+            docs.put(_DONE)
+
+    def _actions(
+        self, docs: "queue.Queue[Any]", readers: int, es_index: str, op_type: Optional[str]
+    ) -> Iterator[dict]:
+        """
+        Build bulk actions lazily from queued hits until all readers are done.
+        """
+        done = 0
+        while done < readers:
+            hit = docs.get()
+            if hit is _DONE:
+                done += 1
+                continue
+            source = hit["_source"]
+            if self.transform is not None:
+                source = self.transform(source)
+                if source is None:
+                    continue
+            action = {
+                "_op_type": op_type or "index",
+                "_index": es_index,
+                "_id": hit["_id"],
+                "_source": source,
+            }
+            if hit.get("_routing"):
+                action["routing"] = hit["_routing"]
+            yield action
+
+    @staticmethod
+    def _count(status: TaskStatus, ok: bool, item: dict, errors: List[str]) -> None:
+        result = next(iter(item.values()))
+        if ok:
+            if result.get("result") == "updated":
+                status.updated += 1
+            else:
+                status.created += 1
+        elif result.get("status") == 409:
+            # Document already exists with op_type create, the same as conflicts=proceed.
+            status.version_conflicts += 1
+        else:
+            errors.append(str(result.get("error", result)))
@@ -0,0 +1,165 @@
+"""
+Live rethrottling of in-flight reindex tasks.
+
+The aggregate docs/sec limit is shared between running tasks and applied with
+`_reindex/{task_id}/_rethrottle`. It is halved while the dest cluster rejects
+or queues writes, and grows back up to `target_docs_per_sec` (only enforced in
+`peak_hours`, if given) or to unlimited when the cluster keeps up.
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from elasticsearch import Elasticsearch
+
+from .const import DEFAULT_MIN_DOCS_PER_SEC, DEFAULT_WRITE_QUEUE_HIGH
+from .logs import create_logger
+from .schema import TaskStatus
+
+logger = create_logger(__name__)
+
+
+def parse_hours(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    Parse `start-end` hours (e.g. `8-20`, `22-6`), end hour is exclusive.
+    """
+    if not value:
+        return None
+    start, end = (int(hour) for hour in value.split("-", 1))
+    return start % 24, end % 24
+
+
+def in_hours(hours: Optional[Tuple[int, int]], now: Optional[datetime] = None) -> bool:
+    if hours is None:
+        return True
+    hour = (now or datetime.now()).hour
+    start, end = hours
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+class ReindexThrottle:
+    """
+    Compute requests_per_second for reindex tasks from dest pressure and target rate.
+    """
+
+    def __init__(
+        self,
+        es_client: Elasticsearch,
+        requests_per_second: Optional[float] = None,
+        target_docs_per_sec: Optional[float] = None,
+        peak_hours: Optional[str] = None,
+        adaptive: bool = False,
+        write_queue_high: int = DEFAULT_WRITE_QUEUE_HIGH,
+        min_docs_per_sec: float = DEFAULT_MIN_DOCS_PER_SEC,
+    ) -> None:
+        self.es_client = es_client
+        self.target_docs_per_sec = target_docs_per_sec
+        self.peak_hours = parse_hours(peak_hours)
+        self.adaptive = adaptive
+        self.write_queue_high = write_queue_high
+        self.min_docs_per_sec = min_docs_per_sec
+        # Per task rate given by user, used until the first adjustment.
+        self._task_rate = requests_per_second
+        # Aggregate docs/sec limit of all running tasks, None is unlimited.
+        self._rate: Optional[float] = None
+        self._applied: Dict[str, float] = {}
+        self._created: Dict[str, int] = {}
+        self._rejected: Optional[int] = None
+        self._polled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.adaptive or bool(self.target_docs_per_sec)
+
+    def requests_per_second(self, running: int = 1) -> Optional[float]:
+        """
+        Return requests_per_second for a new task, None is unlimited.
+        """
+        with self._lock:
+            if self._rate is None:
+                return self._task_rate
+            return round(max(self._rate / max(1, running), 1.0), 2)
+
+    def _ceiling(self) -> Optional[float]:
+        if self.target_docs_per_sec and in_hours(self.peak_hours):
+            return float(self.target_docs_per_sec)
+        return None
+
+    def _under_pressure(self) -> bool:
+        """
+        Sample write thread pools of dest nodes, rejections since last sample or long queue is pressure.
+        """
+        if not self.adaptive:
+            return False
+        rows = self.es_client.cat.thread_pool(
+            thread_pool_patterns="write", h="queue,rejected", format="json"
+        )
+        queue = max((int(row.get("queue") or 0) for row in rows), default=0)
+        rejected = sum(int(row.get("rejected") or 0) for row in rows)
+        previous, self._rejected = self._rejected, rejected
+        return queue >= self.write_queue_high or (previous is not None and rejected > previous)
+
+    def update(self, running: List[TaskStatus]) -> None:
+        """
+        Adjust the rate after every monitor poll and rethrottle running tasks.
+        """
+        if not self.enabled:
+            return
+
+        now = time.monotonic()
+        elapsed, self._polled_at = max(now - self._polled_at, 1e-3), now
+        created = {status.task_id: status.created for status in running}
+        measured = sum(
+            max(count - self._created.get(task_id, count), 0) for task_id, count in created.items()
+        ) / elapsed
+        self._created = created
+        if not running:
+            return
+
+        ceiling = self._ceiling()
+        pressure = self._under_pressure()
+        with self._lock:
+            rate = self._rate
+            if pressure:
+                rate = max(self.min_docs_per_sec, (rate or measured or ceiling or self.min_docs_per_sec) / 2)
+            elif rate is not None:
+                rate *= 1.5
+                if ceiling is None and rate > measured * 2:
+                    rate = None
+            if ceiling is not None:
+                rate = ceiling if rate is None else min(rate, ceiling)
+            if rate != self._rate:
+                logger.info(
+                    f"Reindex rate: {measured:.0f} docs/sec. Pressure: {pressure}. "
+                    f"Limit: {self._rate} -> {rate} docs/sec"
+                )
+            self._rate = rate
+
+        self.rethrottle([status.task_id for status in running])
+
+    def track(self, task_id: str, requests_per_second: Optional[float]) -> None:
+        """
+        Remember the rate a new task was created with.
+        """
+        self._applied[task_id] = requests_per_second or -1
+
+    def rethrottle(self, task_ids: List[str]) -> None:
+        """
+        Apply current per task rate to running tasks, skip tasks with close enough rate.
+        """
+        task_rate = self.requests_per_second(running=len(task_ids)) or -1
+        for task_id in task_ids:
+            applied = self._applied.get(task_id)
+            if applied is not None and abs(applied - task_rate) <= abs(applied) * 0.1:
+                continue
+            try:
+                self.es_client.reindex_rethrottle(task_id=task_id, requests_per_second=task_rate)
+                self._applied[task_id] = task_rate
+            except Exception as exc:
+                logger.error(f"Task id: {task_id}. Can not rethrottle: {exc}")
+        for task_id in set(self._applied) - set(task_ids):
+            self._applied.pop(task_id)
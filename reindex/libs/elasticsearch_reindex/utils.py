@@ -1,10 +1,15 @@
-from typing import Iterable, List, Tuple
+from typing import Iterable, Iterator, List, Tuple
 
 from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
+from elasticsearch.helpers import parallel_bulk, streaming_bulk
 
+from .const import (
+    DEFAULT_BULK_CHUNK_SIZE,
+    DEFAULT_MAX_BULK_ERRORS,
+    DEFAULT_MAX_CHUNK_BYTES,
+)
 from .logs import create_logger
-from .schema import Index
+from .schema import BulkResult, Index
 
 logger = create_logger(__name__)
 
@@ -18,20 +23,71 @@ def chunkify(lst: List, n: int) -> Iterable:
 
 
 def _get_insert_action(body: dict, es_index: str) -> dict:
-    return {"_index": es_index, **body}
-
-
-def bulk_insert(docs: List[dict], es_client: Elasticsearch, es_index: str) -> None:
+    # Documents with metadata fields (`_id`, `_routing`, ...) are bulk actions
+    # themselves, plain documents are referenced as `_source` without copying.
+    if any(key.startswith("_") for key in body):
+        return {"_index": es_index, **body}
+    return {"_index": es_index, "_source": body}
+
+
+def _get_insert_actions(docs: Iterable[dict], es_index: str) -> Iterator[dict]:
+    return (_get_insert_action(body=item, es_index=es_index) for item in docs)
+
+
+def bulk_insert(
+    docs: Iterable[dict],
+    es_client: Elasticsearch,
+    es_index: str,
+    chunk_size: int = DEFAULT_BULK_CHUNK_SIZE,
+    max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+    thread_count: int = 1,
+    max_errors: int = DEFAULT_MAX_BULK_ERRORS,
+) -> BulkResult:
     """
     Execute insert actions to ElasticSearch.
 
-    :param docs: List with document to insert.
+    Documents are consumed lazily, so a generator is inserted in constant memory.
+
+    :param docs: Iterable (list, generator) with documents to insert.
     :param es_client: ElasticSearch initialized client.
     :param es_index: ElasticSearch index where data will be inserted.
+    :param chunk_size: Max documents per bulk request.
+    :param max_chunk_bytes: Max bulk request size (in bytes).
+    :param thread_count: Bulk requests sent in parallel, 1 is streaming in this thread.
+    :param max_errors: Max failed items kept in result details, all of them are counted.
     """
-    actions = [_get_insert_action(body=item, es_index=es_index) for item in docs]
-    success, failed = bulk(client=es_client, actions=actions, stats_only=True)
-    logger.info(f"Successfully actions: {success}. Failed actions: {failed}")
+    actions = _get_insert_actions(docs=docs, es_index=es_index)
+    if thread_count > 1:
+        results = parallel_bulk(
+            client=es_client,
+            actions=actions,
+            thread_count=thread_count,
+            chunk_size=chunk_size,
+            max_chunk_bytes=max_chunk_bytes,
+            raise_on_error=False,
+            raise_on_exception=False,
+        )
+    else:
+        results = streaming_bulk(
+            client=es_client,
+            actions=actions,
+            chunk_size=chunk_size,
+            max_chunk_bytes=max_chunk_bytes,
+            raise_on_error=False,
+            raise_on_exception=False,
+        )
+
+    result = BulkResult()
+    for ok, item in results:
+        if ok:
+            result.success += 1
+            continue
+        result.failed += 1
+        if len(result.errors) < max_errors:
+            result.errors.append(item)
+
+    logger.info(f"Successfully actions: {result.success}. Failed actions: {result.failed}")
+    return result
 
 
 def get_flatten_dict(data: List[Index]) -> dict:
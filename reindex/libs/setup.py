@@ -19,7 +19,6 @@ packages = [package for package in find_packages(where=".", exclude=("test*",))]
 install_requires = [
     "click-default-group==1.2.2",
     "elasticsearch>=7.13.4,<8",
-    "requests>=2.26.0",
 ]
 
 setup(
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+"""
+    test_template.py
+    ~~~~~~~~
+    可组合索引模板须带上索引的 settings, 否则匹配到的索引不再应用旧版模板中的分片数/副本数/ILM 等
+
+    :author: Fufu, 2026/10/18
+"""
+from esm.template import plan_templates, sync_templates
+
+MAPPINGS = {'properties': {'message': {'type': 'text'}}}
+SETTINGS = {
+    'index': {
+        'number_of_shards': '6',
+        'number_of_replicas': '2',
+        'refresh_interval': '30s',
+        'lifecycle': {'name': 'logs-30d'},
+        'uuid': 'RMG1pQ3GQ2a6hRZ5Hk7sXg',
+        'creation_date': '1760745600000',
+        'provided_name': 'nginx_log_261017',
+        'version': {'created': '7170099'},
+    }
+}
+
+
+class FakeIndices:
+    def __init__(self):
+        self.templates = {}
+
+    def get_index_template(self, name, ignore=None, http_auth=None):
+        return {'index_templates': []}
+
+    def put_index_template(self, name, body, http_auth=None):
+        self.templates[name] = body
+
+    def delete_index_template(self, name, http_auth=None):
+        self.templates.pop(name, None)
+
+
+class FakeES:
+    def __init__(self):
+        self.indices = FakeIndices()
+
+
+def test_template_keeps_index_settings():
+    confs = {'nginx_log': {'mappings': MAPPINGS, 'settings': SETTINGS}}
+    templates, covered = plan_templates(confs, [], '_%y%m%d', 200)
+
+    settings = templates[covered['nginx_log']]['template']['settings']['index']
+    assert settings == {
+        'number_of_shards': '6',
+        'number_of_replicas': '2',
+        'refresh_interval': '30s',
+        'lifecycle': {'name': 'logs-30d'},
+    }
+
+
+def test_template_groups_by_settings():
+    confs = {
+        'a_log': {'mappings': MAPPINGS, 'settings': SETTINGS},
+        'b_log': {'mappings': MAPPINGS, 'settings': dict(SETTINGS, index=dict(SETTINGS['index'], uuid='x'))},
+        'c_log': {'mappings': MAPPINGS, 'settings': {'index': dict(SETTINGS['index'], number_of_shards='1')}},
+    }
+    _, covered = plan_templates(confs, [], '_%y%m%d', 200)
+
+    # uuid 等索引自身的配置不影响分组, 分片数不同时分开
+    assert covered['a_log'] == covered['b_log']
+    assert covered['a_log'] != covered['c_log']
+
+
+def test_without_settings_no_template():
+    # 不知道 settings 的索引仍由旧版模板决定 settings
+    _, covered = plan_templates({'nginx_log': {'mappings': MAPPINGS}}, [], '_%y%m%d', 200)
+    assert covered == {}
+
+
+def test_sync_templates():
+    es = FakeES()
+    confs = {
+        'nginx_log': {'mappings': MAPPINGS, 'settings': SETTINGS},
+        'other_log': {'mappings': MAPPINGS},
+    }
+    res = sync_templates(es, confs, [], '_%y%m%d', 200)
+
+    (body,) = es.indices.templates.values()
+    assert body['template']['settings']['index']['number_of_shards'] == '6'
+    # 已由模板覆盖的不再携带配置, 其余的不携带 settings
+    assert res == {'nginx_log': {}, 'other_log': {'mappings': MAPPINGS}}